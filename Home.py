@@ -10,12 +10,18 @@ import pandas as pd
 
 sys.path.append(os.path.dirname(__file__))
 
-from data.data_fetcher import get_multiple_stocks_parallel, get_available_symbols
+from data.data_fetcher import get_multiple_stocks_parallel, get_available_symbols, clear_stock_data_cache
+from data.parquet_cache import clear_parquet_cache, get_parquet_cache_stats
+from data.async_fetcher import start_batch_refresh, get_batch_progress
 from indicators.technical import calculate_sma, calculate_macd
+from indicators.lazy import clear_indicator_memo
+from utils.cache_manager import clear_shared_cache
 from utils.light_theme import (
     LIGHT_THEME, get_light_layout, get_light_axis_config, get_light_candlestick_config
 )
-from utils.timeline_helper import calculate_timeline_dates, get_default_timeline_index, get_expected_candles_info
+from utils.timeline_helper import (
+    calculate_timeline_dates, get_default_timeline_index, get_expected_candles_info, get_daily_rangebreaks
+)
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
@@ -132,11 +138,62 @@ show_volume = st.sidebar.checkbox("Volume", value=True)
 st.sidebar.markdown("---")
 
 # Cache management - Use Streamlit's built-in cache clear
+# (chỉ cache trong bộ nhớ; parquet store trên đĩa được giữ lại)
 if st.sidebar.button("🔄 Clear Cache"):
     st.cache_data.clear()
+    clear_stock_data_cache()
+    clear_indicator_memo()
+    clear_shared_cache()
     st.sidebar.success("✅ Cache cleared!")
     st.rerun()
 
+# Parquet store trên đĩa dùng chung cho mọi session -> xóa là thao tác quản trị riêng
+# (VD: store bị lỗi); tải lại toàn bộ lịch sử cho mọi mã sau khi xóa
+with st.sidebar.expander("🛠️ Quản trị parquet store"):
+    store_stats = get_parquet_cache_stats()
+    st.caption(f"{store_stats['total']} file, {store_stats['size_mb']} MB")
+    confirm_wipe = st.checkbox("Xác nhận xóa toàn bộ store", key="confirm_wipe_store")
+    if st.button("🗑️ Xóa parquet store", disabled=not confirm_wipe):
+        clear_parquet_cache()
+        clear_stock_data_cache()
+        st.success("✅ Đã xóa parquet store")
+        st.rerun()
+
+# Refresh toàn bộ danh sách mã vào parquet store: chạy ở thread nền (async, có rate
+# limit theo host) nên sidebar và 6 chart không phải chờ; tiến độ đọc từ get_batch_progress
+if st.sidebar.button("⚡ Tải toàn bộ mã"):
+    started = start_batch_refresh(
+        symbols,
+        start_date=data_start.strftime('%Y-%m-%d'),
+        end_date=data_end.strftime('%Y-%m-%d'),
+        resolution='1D'
+    )
+    if not started:
+        st.sidebar.info("⏳ Đang có batch tải toàn bộ mã chạy")
+
+
+def render_batch_progress():
+    progress = get_batch_progress()
+    if progress is None:
+        return
+
+    if progress['running']:
+        ratio = progress['completed'] / progress['total'] if progress['total'] else 1.0
+        st.progress(ratio, text=f"{progress['completed']}/{progress['total']} mã "
+                                f"({progress['symbols_per_second']:.1f} mã/s)")
+    else:
+        st.success(f"✅ Đã tải {progress['loaded']}/{progress['total']} mã trong "
+                   f"{progress['elapsed']:.0f}s ({progress['symbols_per_second']:.1f} mã/s)")
+
+
+# Tự cập nhật tiến độ mỗi 2 giây nếu Streamlit có st.fragment (>= 1.37),
+# bản cũ hơn cập nhật theo mỗi lần rerun
+if hasattr(st, 'fragment'):
+    render_batch_progress = st.fragment(run_every=2)(render_batch_progress)
+
+with st.sidebar:
+    render_batch_progress()
+
 st.sidebar.info("💡 Chọn mã cổ phiếu ở dropdown trên mỗi chart")
 
 # Title
@@ -374,26 +431,8 @@ def create_single_chart(symbol, df, height=400, show_ma_list=None, show_macd_ind
     x_axis_config = axis_config.copy()
     x_axis_config['showgrid'] = False  # Tắt vertical grid lines
 
-    # Chỉ tạo rangebreaks cho interval Ngày (1D)
-    rangebreaks_list = []
-    if interval == '1D':
-        # Tạo rangebreaks để ẩn các khoảng thời gian không có data
-        # Lấy tất cả các ngày có data
-        all_dates = pd.to_datetime(df['time']).dt.date.tolist()
-
-        # Tạo rangebreaks cho các khoảng giữa các ngày không liên tiếp
-        for i in range(len(all_dates) - 1):
-            current_date = all_dates[i]
-            next_date = all_dates[i + 1]
-            # Nếu có khoảng cách > 1 ngày, tạo rangebreak
-            if (next_date - current_date).days > 1:
-                rangebreaks_list.append({
-                    'bounds': [current_date + timedelta(days=1), next_date]
-                })
-
-        # Giới hạn số lượng rangebreaks để tránh quá nhiều (chỉ lấy 100 rangebreaks đầu)
-        if len(rangebreaks_list) > 100:
-            rangebreaks_list = rangebreaks_list[:100]
+    # Chỉ tạo rangebreaks cho interval Ngày (1D): ẩn cuối tuần + ngày nghỉ lễ
+    rangebreaks_list = get_daily_rangebreaks(df['time']) if interval == '1D' else []
 
     fig.update_xaxes(**x_axis_config, row=1, col=1, rangebreaks=rangebreaks_list if rangebreaks_list else None)
 
@@ -423,6 +462,12 @@ def create_single_chart(symbol, df, height=400, show_ma_list=None, show_macd_ind
     return fig
 
 
+def show_stale_notice(df):
+    """Hiển thị ghi chú khi chart đang dùng data cũ (đang làm mới ở background)"""
+    if df.attrs.get('stale'):
+        st.caption("⏳ Dữ liệu có thể chưa mới nhất - đang cập nhật nền")
+
+
 # Display charts with dropdown on top of each chart
 chart_cols_1 = st.columns(3)
 chart_cols_2 = st.columns(3)
@@ -519,6 +564,7 @@ with chart_cols_1[0]:
         )
         if fig1:
             st.plotly_chart(fig1, use_container_width=True, key='chart1')
+            show_stale_notice(df1)
         else:
             st.error(f"❌ Lỗi render chart **{selected_symbols[0]}**\n\n"
                     f"💡 **Nguyên nhân**: Không đủ dữ liệu sau khi filter\n"
@@ -541,6 +587,7 @@ with chart_cols_1[1]:
         )
         if fig2:
             st.plotly_chart(fig2, use_container_width=True, key='chart2')
+            show_stale_notice(df2)
         else:
             st.error(f"❌ Lỗi render chart **{selected_symbols[1]}**")
     else:
@@ -556,6 +603,7 @@ with chart_cols_1[2]:
         )
         if fig3:
             st.plotly_chart(fig3, use_container_width=True, key='chart3')
+            show_stale_notice(df3)
         else:
             st.error(f"❌ Lỗi render chart **{selected_symbols[2]}**")
     else:
@@ -582,6 +630,7 @@ with chart_cols_2[0]:
         )
         if fig4:
             st.plotly_chart(fig4, use_container_width=True, key='chart4')
+            show_stale_notice(df4)
         else:
             st.error(f"❌ Lỗi render chart **{selected_symbols[3]}**")
     else:
@@ -597,6 +646,7 @@ with chart_cols_2[1]:
         )
         if fig5:
             st.plotly_chart(fig5, use_container_width=True, key='chart5')
+            show_stale_notice(df5)
         else:
             st.error(f"❌ Lỗi render chart **{selected_symbols[4]}**")
     else:
@@ -612,6 +662,7 @@ with chart_cols_2[2]:
         )
         if fig6:
             st.plotly_chart(fig6, use_container_width=True, key='chart6')
+            show_stale_notice(df6)
         else:
             st.error(f"❌ Lỗi render chart **{selected_symbols[5]}**")
     else:
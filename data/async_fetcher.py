@@ -0,0 +1,206 @@
+"""
+Async batch fetch engine cho toàn bộ danh sách mã
+Giới hạn concurrency + token bucket, trả kết quả từng mã ngay khi có
+
+Throughput khi store lạnh bị chặn bởi rate limiter theo host (TCBS 5 request/giây,
+xem data/rate_limiter.HOST_LIMITS): ~5 mã/giây, ~5 phút cho ~1.600 mã. Mã đã có
+trong parquet store và còn hiện hành không gọi API. Vì vậy refresh toàn bộ
+được chạy ở thread nền (start_batch_refresh) thay vì trong Streamlit script.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from data.data_fetcher import load_stock_bars
+from data.rate_limiter import TokenBucket
+
+# Số mã tải đồng thời tối đa: với bucket TCBS 5 request/giây và latency tới
+# ~1.5 s/request, ~8 request đang chờ là đủ để bucket luôn bận; tăng thêm chỉ
+# làm nhiều thread chờ token hơn, không tăng throughput
+DEFAULT_CONCURRENCY = 8
+
+# Giới hạn riêng cho batch (None = chỉ dùng rate limiter dùng chung theo host,
+# đã áp dụng bên trong mỗi lần gọi API)
+DEFAULT_RATE = None
+DEFAULT_BURST = 20
+
+
+async def iter_stocks_async(symbols, start_date, end_date, resolution='1D',
+                            concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+    """
+    Async generator: yield (symbol, DataFrame hoặc None) theo thứ tự hoàn thành
+
+    vnstock là thư viện đồng bộ nên mỗi lần tải chạy trong thread pool riêng;
+    asyncio chỉ điều phối concurrency và rate limit.
+
+    Parameters:
+    -----------
+    symbols : list
+        Danh sách mã cổ phiếu
+    start_date, end_date : str
+        Khoảng ngày ('YYYY-MM-DD')
+    resolution : str
+        Khung thời gian
+    concurrency : int
+        Số request đồng thời tối đa
+    rate : float, optional
+        Giới hạn thêm số mã/giây cho riêng batch này (token bucket).
+        Mỗi request tới TCBS/VCI luôn đi qua rate limiter dùng chung theo host.
+    burst : int
+        Số mã được phép bắt đầu liền khi bucket đầy
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    bucket = TokenBucket(rate, burst) if rate else None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def fetch_one(symbol):
+            async with semaphore:
+                wait = bucket.reserve() if bucket is not None else 0.0
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                try:
+                    df = await loop.run_in_executor(
+                        executor, load_stock_bars, symbol, start_date, end_date, resolution
+                    )
+                except Exception as e:
+                    print(f"[ERROR] Async fetch failed for {symbol}: {e}")
+                    df = None
+                return symbol, df
+
+        tasks = [asyncio.ensure_future(fetch_one(symbol)) for symbol in dict.fromkeys(symbols)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def _collect(symbols, start_date, end_date, resolution, concurrency, rate, burst, on_result):
+    results = {}
+    async for symbol, df in iter_stocks_async(symbols, start_date, end_date, resolution,
+                                              concurrency, rate, burst):
+        results[symbol] = df
+        if on_result is not None:
+            on_result(symbol, df, len(results))
+    return results
+
+
+def fetch_stocks_batch(symbols, start_date, end_date, resolution='1D',
+                       concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                       on_result=None):
+    """
+    Sync wrapper cho iter_stocks_async (gọi được từ Streamlit script)
+
+    Parameters:
+    -----------
+    on_result : callable, optional
+        on_result(symbol, df, completed_count) được gọi ngay khi mỗi mã tải xong
+        (VD: cập nhật st.progress). Nếu chạy trong thread phụ, callback
+        được gọi từ thread đó.
+
+    Returns:
+    --------
+    dict : {symbol: DataFrame hoặc None}
+    """
+    coro = _collect(symbols, start_date, end_date, resolution, concurrency, rate, burst, on_result)
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    # Thread hiện tại đã có event loop đang chạy -> chạy trong thread riêng
+    result = {}
+
+    def runner():
+        try:
+            result['value'] = asyncio.run(coro)
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=runner, daemon=True)
+    thread.start()
+    thread.join()
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
+
+# Tiến độ của batch đang chạy / vừa xong trong process (1 batch mỗi lúc)
+_batch_progress = None
+_batch_lock = threading.Lock()
+
+
+async def _run_batch(symbols, start_date, end_date, resolution, concurrency, progress):
+    # Không giữ DataFrame: batch chỉ để làm đầy parquet store
+    async for symbol, df in iter_stocks_async(symbols, start_date, end_date, resolution, concurrency):
+        with _batch_lock:
+            progress['completed'] += 1
+            if df is not None and not df.empty:
+                progress['loaded'] += 1
+
+
+def start_batch_refresh(symbols, start_date, end_date, resolution='1D', concurrency=DEFAULT_CONCURRENCY):
+    """
+    Tải toàn bộ danh sách mã vào parquet store ở thread nền, trả về ngay
+
+    Streamlit script (sidebar, các chart) không bị chặn trong lúc tải;
+    tiến độ đọc qua get_batch_progress. Mỗi process chỉ chạy 1 batch.
+
+    Returns:
+    --------
+    bool : False nếu đang có batch khác chạy
+    """
+    global _batch_progress
+
+    symbols = list(dict.fromkeys(symbols))
+    with _batch_lock:
+        if _batch_progress is not None and _batch_progress['running']:
+            return False
+        progress = {
+            'total': len(symbols),
+            'completed': 0,
+            'loaded': 0,
+            'running': True,
+            'started_at': time.monotonic(),
+            'finished_at': None,
+        }
+        _batch_progress = progress
+
+    def runner():
+        try:
+            asyncio.run(_run_batch(symbols, start_date, end_date, resolution, concurrency, progress))
+        except Exception as e:
+            print(f"[ERROR] Batch refresh failed: {e}")
+        finally:
+            with _batch_lock:
+                progress['running'] = False
+                progress['finished_at'] = time.monotonic()
+            print(f"[SUCCESS] Batch refresh: {progress['loaded']}/{progress['total']} symbols "
+                  f"in {progress['finished_at'] - progress['started_at']:.1f}s")
+
+    threading.Thread(target=runner, name='batch-refresh', daemon=True).start()
+    return True
+
+
+def get_batch_progress():
+    """
+    Tiến độ của batch gần nhất
+
+    Returns:
+    --------
+    dict or None : total, completed, loaded, running, elapsed (giây),
+        symbols_per_second; None nếu chưa chạy batch nào
+    """
+    with _batch_lock:
+        if _batch_progress is None:
+            return None
+        progress = dict(_batch_progress)
+
+    started_at = progress.pop('started_at')
+    finished_at = progress.pop('finished_at') or time.monotonic()
+    progress['elapsed'] = finished_at - started_at
+    progress['symbols_per_second'] = progress['completed'] / progress['elapsed'] if progress['elapsed'] > 0 else 0.0
+    return progress
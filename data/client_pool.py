@@ -0,0 +1,92 @@
+"""
+Client pool - dùng lại client vnstock và HTTP session giữa các thread
+Tránh dựng lại Vnstock().stock(...) và TLS handshake cho mỗi lần tải nhỏ
+"""
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from data.rate_limiter import acquire_host
+
+# Số client (symbol, source) giữ lại tối đa
+MAX_POOLED_CLIENTS = 256
+
+# Kích thước connection pool cho mỗi host (>= số worker của ThreadPoolExecutor)
+HTTP_POOL_SIZE = 16
+
+_lock = threading.Lock()
+_vnstock = None
+_clients = OrderedDict()
+_session = None
+
+
+def _get_vnstock():
+    global _vnstock
+    if _vnstock is None:
+        from vnstock import Vnstock
+        _vnstock = Vnstock()
+    return _vnstock
+
+
+def get_stock_client(symbol, source):
+    """
+    Lấy client vnstock cho (symbol, source), tạo mới nếu chưa có trong pool
+
+    Returns:
+    --------
+    vnstock StockComponents (dùng .quote.history(...))
+    """
+    key = (symbol, source)
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client
+        vnstock = _get_vnstock()
+
+    # Dựng client ngoài lock để các symbol khác không phải chờ
+    client = vnstock.stock(symbol=symbol, source=source)
+
+    with _lock:
+        client = _clients.setdefault(key, client)
+        _clients.move_to_end(key)
+        while len(_clients) > MAX_POOLED_CLIENTS:
+            _clients.popitem(last=False)
+
+    return client
+
+
+def discard_stock_client(symbol, source):
+    """Bỏ client khỏi pool (VD: sau khi gọi lỗi) để lần sau tạo lại"""
+    with _lock:
+        _clients.pop((symbol, source), None)
+
+
+def get_http_session():
+    """
+    Lấy requests.Session dùng chung (keep-alive + connection pooling)
+
+    urllib3 connection pool bên dưới là thread-safe nên có thể dùng
+    trực tiếp từ các worker của ThreadPoolExecutor.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def http_get(url, **kwargs):
+    """GET qua session dùng chung, sau khi qua rate limiter của host"""
+    acquire_host(url)
+    return get_http_session().get(url, **kwargs)
+
+
+def get_pool_stats():
+    """Lấy thống kê pool"""
+    with _lock:
+        return {'clients': len(_clients), 'max_clients': MAX_POOLED_CLIENTS}
@@ -0,0 +1,129 @@
+"""
+CSV ingest - parse file OHLCV (long format: symbol, date, open, high, low,
+close, volume) theo từng chunk
+
+Body HTTP được ghi ra file tạm trong lúc tải (kèm md5), nên biết nội dung
+có đổi không trước khi parse và không giữ toàn bộ body dạng bytes + 1 string
+lớn như read_csv(StringIO(...)),
+dtype được cố định thay vì để pandas tự suy luận:
+symbol -> category, date -> datetime64, giá -> float32, volume -> int64
+"""
+import os
+import csv
+import hashlib
+import tempfile
+import pandas as pd
+
+# Số dòng mỗi chunk khi parse
+CSV_CHUNK_ROWS = 200_000
+
+# Kích thước mỗi lần đọc từ HTTP response
+HTTP_READ_BYTES = 1024 * 1024
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+REQUIRED_COLUMNS = ['symbol', 'date'] + PRICE_COLUMNS + ['volume']
+
+
+def spool_response(response):
+    """
+    Ghi body của requests.Response (nên gọi với stream=True) ra file tạm,
+    đồng thời tính md5 - biết hash trước khi parse mà không giữ body trong RAM
+
+    Parameters:
+    -----------
+    response : requests.Response
+
+    Returns:
+    --------
+    tuple : (path, content_hash)
+        path là file tạm, người gọi tự xóa sau khi dùng;
+        content_hash giống hashlib.md5(response.content)
+    """
+    md5 = hashlib.md5()
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=HTTP_READ_BYTES):
+                md5.update(chunk)
+                f.write(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, md5.hexdigest()
+
+
+def _normalize_chunk(chunk):
+    chunk['date'] = pd.to_datetime(chunk['date']).dt.normalize()
+    chunk = chunk.dropna()
+    # Volume được parse dạng float (có thể là "1.2e6") rồi mới ép về int64 sau khi bỏ NaN
+    return chunk.assign(volume=chunk['volume'].round().astype('int64'))
+
+
+def read_ohlcv_csv_file(path):
+    """
+    Parse file CSV (VD: body đã spool bằng spool_response) theo chunk
+
+    Parameters:
+    -----------
+    path : str
+
+    Returns:
+    --------
+    pd.DataFrame
+
+    Raises:
+    -------
+    ValueError : thiếu cột bắt buộc hoặc giá trị không parse được theo dtype
+    """
+    # utf-8-sig: bỏ BOM ở đầu file (CSV xuất từ Excel / Google Sheets)
+    with open(path, 'r', encoding='utf-8-sig', newline='') as text:
+        header = next(csv.reader([text.readline()]), [])
+        names = [col.lower().strip() for col in header]
+        missing = [col for col in REQUIRED_COLUMNS if col not in names]
+        if missing:
+            raise ValueError(f"CSV thiếu cột: {missing}")
+
+        dtype = {col: 'float32' for col in PRICE_COLUMNS}
+        dtype.update({'symbol': 'str', 'volume': 'float64'})
+
+        chunks = [
+            _normalize_chunk(chunk)
+            for chunk in pd.read_csv(text, header=None, names=names, dtype=dtype, chunksize=CSV_CHUNK_ROWS)
+        ]
+
+    if chunks:
+        df = pd.concat(chunks, ignore_index=True)
+    else:
+        df = pd.DataFrame(columns=names).astype(dtype)
+    df['symbol'] = df['symbol'].astype('category')
+
+    return df
+
+
+def apply_ohlcv_schema(df):
+    """
+    Ép df về schema gọn (symbol category, giá float32, volume int64)
+
+    Dùng sau khi gộp nhiều nguồn: pd.concat các categorical khác categories
+    trả về str, và frame từ read_ohlcv_csv có dtype suy luận (float64).
+    """
+    return df.astype({
+        'symbol': 'category',
+        **{col: 'float32' for col in PRICE_COLUMNS},
+        'volume': 'int64',
+    })
+
+
+def read_ohlcv_csv(path):
+    """
+    Parse file CSV theo cách cũ (dtype suy luận, giá trị lỗi -> NaN rồi bỏ)
+
+    Dùng khi file có giá trị không parse được theo dtype cố định.
+    """
+    df = pd.read_csv(path, encoding='utf-8-sig')
+    df['date'] = pd.to_datetime(df['date']).dt.normalize()
+    df.columns = [col.lower().strip() for col in df.columns]
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df.dropna(inplace=True)
+    return df
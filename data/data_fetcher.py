@@ -1,30 +1,67 @@
 """
 Module để lấy dữ liệu cổ phiếu từ vnstock với parallel loading
 """
+import time
+import threading
 import pandas as pd
-from vnstock import Vnstock
 from datetime import datetime, timedelta
 import streamlit as st
 from concurrent.futures import ThreadPoolExecutor, as_completed
-
-
-@st.cache_data(ttl=300, show_spinner=False)
-def fetch_stock_data_raw(symbol, start_date, end_date, resolution='1D'):
+from data.parquet_cache import (
+    OHLCV_COLUMNS, load_stored_bars, get_last_stored_bar, get_missing_ranges, save_stored_bars,
+    get_check_bar, history_changed, drop_stored_bars, save_indicator_state, load_indicator_state
+)
+from data.resampler import DERIVED_RESOLUTIONS, resample_ohlcv
+from data.client_pool import get_stock_client, discard_stock_client, http_get
+from data.rate_limiter import acquire_host
+from data.single_flight import single_flight
+from utils.market_calendar import get_dynamic_ttl, now_vn, record_session_evidence
+from data.source_router import get_source_order, record_success, record_failure
+from indicators.streaming import seed_indicators, advance_indicators, indicator_from_dict
+from indicators.lazy import checkout_copy
+
+
+# Stale-while-revalidate: data được coi là mới trong FRESH_SECONDS (trong phiên;
+# ngoài giờ giao dịch thì tới phiên kế tiếp), bản cũ vẫn được phục vụ
+# (và làm mới ở background) tới SWR_MAX_AGE_SECONDS
+FRESH_SECONDS = 300
+SWR_MAX_AGE_SECONDS = 24 * 3600
+
+_swr_entries = {}
+_swr_refreshing = set()
+_swr_lock = threading.Lock()
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='swr-refresh')
+
+# Streaming indicators theo store: (symbol, resolution) -> (indicators, committed_through)
+# và giá trị tại bar cuối: (symbol, resolution) -> {'time': ..., 'values': {...}}
+_indicator_states = {}
+_indicator_values = {}
+_indicator_lock = threading.Lock()
+
+
+def _fetch_from_sources(symbol, start_date, end_date, resolution='1D'):
     """
-    Fetch data từ API with multi-source fallback
-    Cached for 5 minutes using Streamlit's built-in cache
+    Fetch data từ API with multi-source fallback (không qua cache)
 
     IMPORTANT:
     - TCBS: Works on Cloud, returns all data for 1W/1M (needs manual filtering)
     - VCI: May be blocked on Cloud
-    - Strategy: Use TCBS first for all intervals, filter data manually
+    - Strategy: Source order comes from source_router (TCBS first by default), filter data manually
+
+    Returns:
+    --------
+    pd.DataFrame or None
+        DataFrame rỗng nếu nguồn trả lời nhưng không có bar nào trong khoảng,
+        None nếu tất cả nguồn đều lỗi
     """
-    # Use TCBS first for all intervals (works on Cloud)
-    sources = ['TCBS', 'VCI']
+    # Thứ tự nguồn do router quyết định (nguồn nhanh và khỏe trước, bỏ qua nguồn đang mở breaker)
+    answered_empty = False
 
-    for source in sources:
+    for source in get_source_order():
+        acquire_host(source)
+        started = time.monotonic()
         try:
-            stock = Vnstock().stock(symbol=symbol, source=source)
+            stock = get_stock_client(symbol, source)
 
             df = stock.quote.history(
                 start=start_date,
@@ -34,6 +71,8 @@ def fetch_stock_data_raw(symbol, start_date, end_date, resolution='1D'):
 
             if df is None or df.empty:
                 print(f"[WARNING] No data from {source} for {symbol}, trying next...")
+                record_success(source, time.monotonic() - started)
+                answered_empty = True
                 continue
 
             # Đổi tên cột cho dễ sử dụng
@@ -52,6 +91,7 @@ def fetch_stock_data_raw(symbol, start_date, end_date, resolution='1D'):
             required_cols = ['time', 'open', 'high', 'low', 'close', 'volume']
             if not all(col in df.columns for col in required_cols):
                 print(f"[WARNING] Missing columns from {source} for {symbol}: {df.columns.tolist()}")
+                record_failure(source, time.monotonic() - started)
                 continue
 
             # Convert time to datetime
@@ -73,23 +113,297 @@ def fetch_stock_data_raw(symbol, start_date, end_date, resolution='1D'):
             end_dt = pd.to_datetime(end_date)
             df = df[(df['time'] >= start_dt) & (df['time'] <= end_dt)].reset_index(drop=True)
 
+            record_success(source, time.monotonic() - started)
+
             # Log success with source info
             print(f"[SUCCESS] Fetched {symbol} from {source} ({len(df)} rows after filter)")
 
             return df
 
         except Exception as e:
+            record_failure(source, time.monotonic() - started)
+            discard_stock_client(symbol, source)
             print(f"[ERROR] {source} failed for {symbol}: {str(e)}")
             continue
 
+    if answered_empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+
     # All sources failed
     print(f"[ERROR] All sources failed for {symbol}")
     return None
 
 
+def _load_bars(symbol, start_date, end_date, resolution='1D'):
+    """
+    Lấy data từ parquet store trên đĩa, chỉ gọi API cho các khoảng còn thiếu
+
+    Store sống sót qua restart nên cold start chỉ cần tải phần đuôi
+    [bar cuối đã lưu, end_date] thay vì toàn bộ 2-3 năm lịch sử. Phần đuôi
+    lấy thêm 1 bar đã đóng; nếu bar đó khác bản đã lưu (giá được điều chỉnh
+    sau sự kiện doanh nghiệp) thì store được tải lại toàn bộ.
+
+    Streaming indicators được seed / cập nhật theo store sau mỗi lần load.
+    """
+    stored_df = load_stored_bars(symbol, resolution)
+    last_bar = get_last_stored_bar(symbol, resolution)
+    rebuilt = False
+
+    for range_start, range_end in get_missing_ranges(symbol, resolution, start_date, end_date):
+        check_bar = None
+        if last_bar is not None and pd.Timestamp(range_start) >= last_bar:
+            # Tải lùi thêm 1 bar đã đóng để phát hiện lịch sử bị điều chỉnh lại
+            check_bar = get_check_bar(stored_df, last_bar)
+            if check_bar is not None:
+                range_start = check_bar.strftime('%Y-%m-%d')
+            print(f"[INCREMENTAL] Fetching tail {range_start} -> {range_end} for {symbol} ({resolution})")
+        new_df = _fetch_from_sources(symbol, range_start, range_end, resolution)
+        if new_df is None:
+            # Network lỗi: vẫn dùng phần đã có trong store
+            continue
+
+        if check_bar is not None and history_changed(stored_df, new_df, check_bar):
+            # Sự kiện doanh nghiệp: giá cũ trong store không còn khớp -> tải lại toàn bộ
+            print(f"[WARNING] {symbol} ({resolution}) history was re-adjusted, rebuilding store")
+            full_df = _fetch_from_sources(symbol, start_date, end_date, resolution)
+            if full_df is None:
+                # Không merge đuôi đã điều chỉnh vào lịch sử cũ; dùng tạm store hiện có
+                continue
+            drop_stored_bars(symbol, resolution)
+            stored_df = save_stored_bars(symbol, resolution, full_df, start_date, end_date)
+            rebuilt = True
+            break
+
+        _record_session_evidence(new_df, range_end, resolution)
+        stored_df = save_stored_bars(symbol, resolution, new_df, range_start, range_end)
+
+    _update_streaming_indicators(symbol, resolution, stored_df, reseed=rebuilt)
+
+    if stored_df is None or stored_df.empty:
+        return None
+
+    start_dt = pd.to_datetime(start_date)
+    end_dt = pd.to_datetime(end_date)
+    df = stored_df[(stored_df['time'] >= start_dt) & (stored_df['time'] <= end_dt)].reset_index(drop=True)
+
+    return df
+
+
+def _record_session_evidence(new_df, range_end, resolution):
+    # Khoảng tải có chứa hôm nay: bar hôm nay có hay không cho biết hôm nay có phiên
+    # (ngày nghỉ chưa có trong utils/market_calendar.MARKET_HOLIDAYS)
+    if resolution != '1D':
+        return
+    today = now_vn().date()
+    if pd.Timestamp(range_end).date() < today:
+        return
+    has_today_bar = not new_df.empty and (pd.to_datetime(new_df['time']).dt.date == today).any()
+    record_session_evidence(bool(has_today_bar))
+
+
+def _restore_indicator_state(symbol, resolution):
+    loaded = load_indicator_state(symbol, resolution)
+    if loaded is None:
+        return None
+
+    committed_through, states = loaded
+    try:
+        return {key: indicator_from_dict(data) for key, data in states.items()}, committed_through
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"[WARNING] Invalid indicator state for {symbol} {resolution}: {e}")
+        return None
+
+
+def _update_streaming_indicators(symbol, resolution, stored_df, reseed=False):
+    """
+    Đưa các bar mới của store vào streaming indicators (indicators/streaming.py)
+
+    State được seed từ store lần đầu (hoặc khi store vừa được tải lại) và
+    lưu cạnh file parquet mỗi khi có bar mới được commit. Bar cuối của store
+    (đang hình thành) không được commit nên lần refresh sau thay được giá.
+    """
+    if stored_df is None or stored_df.empty:
+        return
+
+    key = (symbol, resolution)
+    with _indicator_lock:
+        state = None if reseed else (_indicator_states.get(key) or _restore_indicator_state(symbol, resolution))
+        values = None
+        if state is not None:
+            indicators, committed_through = state
+            try:
+                values, new_committed = advance_indicators(indicators, stored_df, committed_through)
+            except ValueError as e:
+                print(f"[WARNING] Reseeding indicator state for {symbol} {resolution}: {e}")
+
+        if values is None:
+            indicators, committed_through = seed_indicators(stored_df)
+            values, new_committed = advance_indicators(indicators, stored_df, committed_through)
+            changed = True
+        else:
+            changed = new_committed != committed_through
+
+        if changed:
+            states = {name: indicator.to_dict() for name, indicator in indicators.items()}
+            save_indicator_state(symbol, resolution, states, new_committed)
+
+        _indicator_states[key] = (indicators, new_committed)
+        _indicator_values[key] = {'time': pd.Timestamp(stored_df['time'].iloc[-1]), 'values': values}
+
+
+def get_latest_indicators(symbol, resolution='1D'):
+    """
+    Giá trị streaming indicators tại bar cuối của store (tính cả bar đang hình thành)
+
+    Returns:
+    --------
+    dict or None : {'time': pd.Timestamp, 'values': {key: value}}, None nếu mã
+        chưa được load trong process (key xem indicators/streaming.STORE_INDICATORS)
+    """
+    with _indicator_lock:
+        return _indicator_values.get((symbol, resolution))
+
+
+def _load_bars_coalesced(symbol, start_date, end_date, resolution='1D'):
+    """
+    _load_bars với single-flight theo (symbol, range, resolution)
+
+    st.cache_data không gộp các cache miss đang chạy song song, nên khi nhiều
+    session cùng mở Home.py lúc mở cửa, chỉ 1 request thật sự tới TCBS/VCI.
+    """
+    key = (symbol, str(start_date)[:10], str(end_date)[:10], resolution)
+    return single_flight(key, _load_bars, symbol, start_date, end_date, resolution)
+
+
+def load_stock_bars(symbol, start_date, end_date, resolution='1D'):
+    """
+    Lấy data OHLCV (parquet store + API cho phần thiếu), không qua st.cache_data
+
+    '1W'/'1M' được resample từ store '1D' nên đổi interval không cần gọi API
+    (và tránh luôn bug TCBS trả về toàn bộ data cho 1W/1M).
+    """
+    if resolution not in DERIVED_RESOLUTIONS:
+        return _load_bars_coalesced(symbol, start_date, end_date, resolution)
+
+    daily_df = _load_bars_coalesced(symbol, start_date, end_date, '1D')
+    if daily_df is None or daily_df.empty:
+        return None
+
+    df = resample_ohlcv(daily_df, resolution)
+
+    # Giống filter cũ: bỏ nến đầu kỳ bị cắt dở trước start_date
+    df = df[df['time'] >= pd.to_datetime(start_date)].reset_index(drop=True)
+
+    return df
+
+
+def _refresh_in_background(key, symbol, start_date, end_date, resolution):
+    """
+    Tải lại (incremental tail qua parquet store) và thay entry SWR khi xong
+
+    Streaming indicators của mã được cập nhật cùng lúc (_load_bars), bar
+    đang hình thành được tính lại theo giá mới.
+    """
+    try:
+        df = load_stock_bars(symbol, start_date, end_date, resolution)
+        if df is not None and not df.empty:
+            with _swr_lock:
+                _swr_entries[key] = _make_swr_entry(df)
+    except Exception as e:
+        print(f"[WARNING] Background refresh failed for {symbol}: {e}")
+    finally:
+        with _swr_lock:
+            _swr_refreshing.discard(key)
+
+
+def _make_swr_entry(df):
+    now = time.monotonic()
+    return {'df': df, 'fetched_at': now, 'expires_at': now + get_dynamic_ttl(FRESH_SECONDS)}
+
+
+def _prune_swr_entries(now):
+    expired = [key for key, entry in _swr_entries.items()
+               if now - entry['fetched_at'] > SWR_MAX_AGE_SECONDS]
+    for key in expired:
+        del _swr_entries[key]
+
+
+def _get_swr_frame(symbol, start_date, end_date, resolution='1D'):
+    """
+    Frame dùng chung trong entry SWR (không được sửa, xem fetch_stock_data_raw)
+
+    Returns:
+    --------
+    tuple : (pd.DataFrame or None, stale: bool)
+    """
+    key = (symbol, str(start_date)[:10], str(end_date)[:10], resolution)
+    now = time.monotonic()
+
+    with _swr_lock:
+        entry = _swr_entries.get(key)
+        # Quá SWR_MAX_AGE_SECONDS thì không phục vụ stale nữa, coi như miss
+        if entry is not None and now - entry['fetched_at'] > SWR_MAX_AGE_SECONDS:
+            del _swr_entries[key]
+            entry = None
+
+    if entry is None:
+        df = load_stock_bars(symbol, start_date, end_date, resolution)
+        if df is None or df.empty:
+            return df, False
+        with _swr_lock:
+            _prune_swr_entries(now)
+            _swr_entries[key] = _make_swr_entry(df)
+        return df, False
+
+    if now < entry['expires_at']:
+        return entry['df'], False
+
+    with _swr_lock:
+        should_refresh = key not in _swr_refreshing
+        if should_refresh:
+            _swr_refreshing.add(key)
+    if should_refresh:
+        _refresh_executor.submit(_refresh_in_background, key, symbol, start_date, end_date, resolution)
+
+    return entry['df'], True
+
+
+def _checkout_swr_frame(df, stale):
+    # Frame trong entry SWR dùng chung cho mọi session: trả bản sao qua checkout_copy
+    # (shallow nếu có Copy-on-Write, deep nếu không - pandas 2.x mặc định)
+    df = checkout_copy(df)
+    if stale:
+        df.attrs['stale'] = True
+    return df
+
+
+def fetch_stock_data_raw(symbol, start_date, end_date, resolution='1D'):
+    """
+    Fetch data OHLCV với chính sách stale-while-revalidate
+
+    - Data còn mới (TTL động theo phiên HOSE): trả về ngay
+    - Data đã cũ: trả về ngay bản tốt gần nhất (df.attrs['stale'] = True)
+      và tải lại ở background worker bằng incremental tail fetch
+    - Chưa có data hoặc data quá SWR_MAX_AGE_SECONDS: tải đồng bộ (xem load_stock_bars)
+
+    Nhờ vậy không user nào phải chờ refetch đồng bộ mỗi 5 phút. DataFrame trả
+    về là bản sao, caller sửa thoải mái không ảnh hưởng session khác.
+    """
+    return _checkout_swr_frame(*_get_swr_frame(symbol, start_date, end_date, resolution))
+
+
+def clear_stock_data_cache():
+    """Xóa các entry stale-while-revalidate và indicator state trong process"""
+    with _swr_lock:
+        _swr_entries.clear()
+    with _indicator_lock:
+        _indicator_states.clear()
+        _indicator_values.clear()
+
+
 def get_stock_data(symbol, start_date, end_date, resolution='1D', return_indicators=False):
     """
-    Lấy dữ liệu cổ phiếu (sử dụng @st.cache_data decorator)
+    Lấy dữ liệu cổ phiếu (stale-while-revalidate + parquet store)
 
     Parameters:
     -----------
@@ -102,31 +416,25 @@ def get_stock_data(symbol, start_date, end_date, resolution='1D', return_indicat
     resolution : str
         Khung thời gian: '1D' (ngày), '1W' (tuần), '1M' (tháng)
     return_indicators : bool
-        Nếu True, return (df, indicators_dict). Nếu False, chỉ return df
+        Nếu True, return (df, indicators). Nếu False, chỉ return df
 
     Returns:
     --------
     pd.DataFrame hoặc tuple(pd.DataFrame, dict)
-        Nếu return_indicators=True: (DataFrame, dict of indicators)
+        Nếu return_indicators=True: (DataFrame, LazyIndicators - dict-like, tính khi truy cập)
         Nếu return_indicators=False: DataFrame
+        df.attrs['stale'] = True nếu đang trả bản cũ trong lúc làm mới ở background
     """
-    # Fetch data (automatically cached by decorator)
-    df = fetch_stock_data_raw(symbol, start_date, end_date, resolution)
+    # Fetch data (stale-while-revalidate, xem fetch_stock_data_raw)
+    shared_df, stale = _get_swr_frame(symbol, start_date, end_date, resolution)
+    df = _checkout_swr_frame(shared_df, stale)
 
     if return_indicators:
-        # Reuse cache_manager's indicator calculation to avoid duplication
-        from utils.cache_manager import calculate_common_indicators
-
-        if df is not None and not df.empty:
-            try:
-                indicators = calculate_common_indicators(df)
-            except Exception as e:
-                print(f"[WARNING] Failed to calculate indicators for {symbol}: {e}")
-                indicators = {}
-
-            return df, indicators
-        else:
-            return df, {}
+        # Indicator chỉ được tính khi truy cập (VD: indicators.get('sma37')),
+        # dùng chung giữa các session xem cùng mã -> gắn với frame dùng chung,
+        # không phải bản sao của caller
+        from utils.cache_manager import get_shared_indicators
+        return df, get_shared_indicators(symbol, start_date, end_date, resolution, shared_df)
 
     return df
 
@@ -179,13 +487,11 @@ def get_available_symbols():
     Lấy danh sách mã cổ phiếu từ Google Drive CSV
     Cached for 1 hour using Streamlit's built-in cache
     """
-    import requests
-
     # Google Drive direct download link
     drive_url = "https://drive.usercontent.google.com/uc?id=1wbBwe3L4m4Yw1NNnOQwePpNxFORxbkmv&export=download"
 
     try:
-        response = requests.get(drive_url, timeout=10)
+        response = http_get(drive_url, timeout=10)
         response.raise_for_status()
 
         # Parse CSV content
@@ -0,0 +1,369 @@
+"""
+Parquet-based persistent OHLCV store
+Lưu dữ liệu từng mã / khung thời gian xuống đĩa để dùng lại sau khi restart
+
+Mỗi (symbol, resolution) có:
+- {symbol}_{resolution}.parquet : toàn bộ bar đã tải
+- {symbol}_{resolution}.json    : khoảng ngày đã được phủ (coverage) + thời điểm cập nhật
+- {symbol}_{resolution}.indicators.json : state của streaming indicators (indicators/streaming.py)
+"""
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from utils.market_calendar import get_dynamic_ttl
+
+PARQUET_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parquet_cache')
+
+# Bar của ngày hiện tại vẫn thay đổi trong phiên -> coi là thiếu sau khoảng này
+# (ngoài giờ giao dịch TTL kéo dài tới phiên kế tiếp, xem utils/market_calendar.py)
+TODAY_REFRESH_SECONDS = 300
+
+OHLCV_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+# Sai lệch tương đối tối đa giữa bar đã lưu và bar tải lại (làm tròn giá của nguồn);
+# lệch hơn nghĩa là nguồn đã điều chỉnh lịch sử (chia cổ tức, tách cổ phiếu)
+ADJUSTMENT_TOLERANCE = 1e-3
+
+_write_lock = threading.Lock()
+
+
+def get_parquet_cache_path(symbol, resolution):
+    """Get parquet file path for given symbol/resolution"""
+    os.makedirs(PARQUET_CACHE_DIR, exist_ok=True)
+    return os.path.join(PARQUET_CACHE_DIR, f"{symbol}_{resolution}.parquet")
+
+
+def _get_meta_path(symbol, resolution):
+    return os.path.join(PARQUET_CACHE_DIR, f"{symbol}_{resolution}.json")
+
+
+def _get_indicator_state_path(symbol, resolution):
+    return os.path.join(PARQUET_CACHE_DIR, f"{symbol}_{resolution}.indicators.json")
+
+
+def _to_day(value):
+    """Chuẩn hóa str/datetime về pd.Timestamp đầu ngày"""
+    return pd.Timestamp(value).normalize()
+
+
+def _align_to_bar_start(day, resolution):
+    """
+    Lùi ngày về đầu bar chứa nó (1W: thứ Hai, 1M: ngày 1)
+
+    Bar tuần/tháng được gắn nhãn theo ngày đầu kỳ nên phải tải lại
+    từ đầu kỳ thì mới lấy được bar đang hình thành.
+    """
+    if resolution == '1W':
+        return day - timedelta(days=day.weekday())
+    if resolution == '1M':
+        return day.replace(day=1)
+    return day
+
+
+def load_stored_bars(symbol, resolution):
+    """
+    Đọc toàn bộ bar đã lưu của 1 mã
+
+    Returns:
+    --------
+    pd.DataFrame or None
+    """
+    parquet_path = get_parquet_cache_path(symbol, resolution)
+    if not os.path.exists(parquet_path):
+        return None
+
+    try:
+        return pd.read_parquet(parquet_path)
+    except Exception as e:
+        print(f"[WARNING] Failed to read parquet store for {symbol} {resolution}: {e}")
+        return None
+
+
+def get_store_coverage(symbol, resolution):
+    """
+    Lấy khoảng ngày đã được phủ bởi store
+
+    Returns:
+    --------
+    dict or None : {'start': Timestamp, 'end': Timestamp, 'updated_at': datetime,
+                    'last_bar': Timestamp or None}
+    """
+    meta_path = _get_meta_path(symbol, resolution)
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return {
+            'start': _to_day(meta['start']),
+            'end': _to_day(meta['end']),
+            'updated_at': datetime.fromisoformat(meta['updated_at']),
+            'last_bar': _to_day(meta['last_bar']) if meta.get('last_bar') else None
+        }
+    except Exception as e:
+        print(f"[WARNING] Invalid parquet store metadata for {symbol} {resolution}: {e}")
+        return None
+
+
+def get_last_stored_bar(symbol, resolution):
+    """
+    Lấy thời điểm của bar cuối cùng trong store (không cần đọc file parquet)
+
+    Returns:
+    --------
+    pd.Timestamp or None
+    """
+    coverage = get_store_coverage(symbol, resolution)
+    return coverage['last_bar'] if coverage is not None else None
+
+
+def merge_bars(stored_df, new_df):
+    """
+    Gộp bar mới vào bar cũ, trùng 'time' thì giữ bản mới nhất
+
+    Returns:
+    --------
+    pd.DataFrame : Sorted by time, unique time
+    """
+    frames = [df for df in (stored_df, new_df) if df is not None and not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    merged = pd.concat(frames, ignore_index=True)
+    merged = merged.sort_values('time', kind='stable')
+    return merged.drop_duplicates(subset=['time'], keep='last').reset_index(drop=True)
+
+
+def get_missing_ranges(symbol, resolution, start_date, end_date):
+    """
+    Tính các khoảng ngày chưa có trong store (cần gọi API)
+
+    Parameters:
+    -----------
+    start_date, end_date : str or datetime
+        Khoảng ngày được yêu cầu
+
+    Returns:
+    --------
+    list of tuple : [(start_str, end_str), ...] theo format 'YYYY-MM-DD'
+    """
+    start_day = _to_day(start_date)
+    end_day = _to_day(end_date)
+    coverage = get_store_coverage(symbol, resolution)
+
+    if coverage is None or not os.path.exists(get_parquet_cache_path(symbol, resolution)):
+        return [(start_day.strftime('%Y-%m-%d'), end_day.strftime('%Y-%m-%d'))]
+
+    ranges = []
+    today = _to_day(datetime.now())
+
+    # Phần đầu (lịch sử cũ hơn store)
+    if start_day < coverage['start']:
+        head_end = coverage['start'] - timedelta(days=1)
+        ranges.append((start_day.strftime('%Y-%m-%d'), head_end.strftime('%Y-%m-%d')))
+
+    # Phần cuối: chỉ tải lại từ bar cuối cùng đã lưu tới end_date.
+    # Store vẫn "hiện hành" nếu đã phủ tới ngày cập nhật và TTL động (theo
+    # phiên HOSE) chưa hết -> ngoài giờ / cuối tuần không cần gọi API.
+    updated_at = coverage['updated_at']
+    expires_at = updated_at + timedelta(seconds=get_dynamic_ttl(TODAY_REFRESH_SECONDS, updated_at))
+    is_current = coverage['end'] >= _to_day(updated_at) and datetime.now() < expires_at
+
+    tail_start = coverage['end'] + timedelta(days=1)
+    if coverage['end'] >= today and not is_current:
+        tail_start = today
+
+    if not is_current and end_day >= tail_start:
+        # Bar cuối (bar hôm nay, bar tuần/tháng đang hình thành) có thể đã thay đổi
+        # nên tải lại chính nó; merge_bars sẽ ghi đè theo 'time'
+        last_bar = coverage['last_bar']
+        if last_bar is not None:
+            tail_start = min(last_bar, tail_start)
+        else:
+            tail_start = _align_to_bar_start(tail_start, resolution)
+        tail_start = max(tail_start, _align_to_bar_start(start_day, resolution))
+        ranges.append((tail_start.strftime('%Y-%m-%d'), end_day.strftime('%Y-%m-%d')))
+
+    return ranges
+
+
+def get_check_bar(stored_df, last_bar):
+    """
+    Bar đã đóng ngay trước last_bar - tải lại cùng phần đuôi để so với store
+
+    Returns:
+    --------
+    pd.Timestamp or None
+    """
+    if stored_df is None or stored_df.empty or last_bar is None:
+        return None
+    earlier = stored_df.loc[stored_df['time'] < last_bar, 'time']
+    return pd.Timestamp(earlier.max()) if not earlier.empty else None
+
+
+def history_changed(stored_df, new_df, check_bar):
+    """
+    So bar check_bar trong store với bản vừa tải lại
+
+    TCBS/VCI trả giá đã điều chỉnh theo sự kiện doanh nghiệp; sau chia cổ tức /
+    tách cổ phiếu thì toàn bộ lịch sử đổi, merge phần đuôi vào store sẽ tạo
+    bước nhảy giá giả.
+
+    Returns:
+    --------
+    bool : True nếu giá OHLC khác (store cần tải lại toàn bộ)
+    """
+    columns = ['open', 'high', 'low', 'close']
+    stored_row = stored_df.loc[stored_df['time'] == check_bar, columns]
+    new_row = new_df.loc[new_df['time'] == check_bar, columns]
+    if stored_row.empty or new_row.empty:
+        return False
+
+    return not np.allclose(stored_row.to_numpy(dtype=float)[-1], new_row.to_numpy(dtype=float)[-1],
+                           rtol=ADJUSTMENT_TOLERANCE, equal_nan=True)
+
+
+def drop_stored_bars(symbol, resolution):
+    """Xóa store của 1 mã (parquet + coverage + indicator state) để tải lại từ đầu"""
+    with _write_lock:
+        for path in (get_parquet_cache_path(symbol, resolution), _get_meta_path(symbol, resolution),
+                     _get_indicator_state_path(symbol, resolution)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"[WARNING] Failed to remove {path}: {e}")
+
+
+def save_stored_bars(symbol, resolution, new_df, start_date, end_date):
+    """
+    Gộp bar mới vào store và mở rộng coverage
+
+    Parameters:
+    -----------
+    new_df : pd.DataFrame
+        Bar mới tải về (có thể rỗng nếu nguồn không có dữ liệu trong khoảng)
+    start_date, end_date : str or datetime
+        Khoảng ngày mà new_df đại diện
+
+    Returns:
+    --------
+    pd.DataFrame : Toàn bộ bar sau khi gộp
+    """
+    start_day = _to_day(start_date)
+    end_day = min(_to_day(end_date), _to_day(datetime.now()))
+
+    with _write_lock:
+        stored_df = load_stored_bars(symbol, resolution)
+        merged = merge_bars(stored_df, new_df)
+
+        coverage = get_store_coverage(symbol, resolution)
+        if coverage is not None and start_day <= coverage['end'] + timedelta(days=1) \
+                and end_day >= coverage['start'] - timedelta(days=1):
+            cov_start = min(start_day, coverage['start'])
+            cov_end = max(end_day, coverage['end'])
+        else:
+            cov_start, cov_end = start_day, end_day
+
+        try:
+            parquet_path = get_parquet_cache_path(symbol, resolution)
+            tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+            merged.to_parquet(tmp_path, compression='snappy', index=False)
+            os.replace(tmp_path, parquet_path)
+
+            # Ghi file tạm rồi os.replace: get_store_coverage đọc không cần lock
+            # (thread / process khác) nên không được thấy file ghi dở
+            meta_path = _get_meta_path(symbol, resolution)
+            tmp_meta_path = f"{meta_path}.{os.getpid()}.tmp"
+            with open(tmp_meta_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'start': cov_start.strftime('%Y-%m-%d'),
+                    'end': cov_end.strftime('%Y-%m-%d'),
+                    'updated_at': datetime.now().isoformat(),
+                    'last_bar': merged['time'].max().strftime('%Y-%m-%d') if not merged.empty else None
+                }, f)
+            os.replace(tmp_meta_path, meta_path)
+        except Exception as e:
+            print(f"[WARNING] Failed to write parquet store for {symbol} {resolution}: {e}")
+
+    return merged
+
+
+def save_indicator_state(symbol, resolution, states, committed_through):
+    """
+    Lưu state của streaming indicators cạnh store
+
+    Parameters:
+    -----------
+    states : dict
+        {key: indicator.to_dict()} (xem indicators/streaming.py)
+    committed_through : pd.Timestamp or None
+        Bar cuối cùng đã commit vào state (bar đang hình thành không được commit)
+    """
+    state_path = _get_indicator_state_path(symbol, resolution)
+    tmp_path = f"{state_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'committed_through': committed_through.isoformat() if committed_through is not None else None,
+                'states': states
+            }, f)
+        os.replace(tmp_path, state_path)
+    except Exception as e:
+        print(f"[WARNING] Failed to write indicator state for {symbol} {resolution}: {e}")
+
+
+def load_indicator_state(symbol, resolution):
+    """
+    Đọc state của streaming indicators
+
+    Returns:
+    --------
+    tuple or None : (committed_through: pd.Timestamp or None, states: dict); None nếu chưa có
+    """
+    state_path = _get_indicator_state_path(symbol, resolution)
+    if not os.path.exists(state_path):
+        return None
+
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        committed_through = payload['committed_through']
+        return (pd.Timestamp(committed_through) if committed_through else None), payload['states']
+    except Exception as e:
+        print(f"[WARNING] Invalid indicator state for {symbol} {resolution}: {e}")
+        return None
+
+
+def clear_parquet_cache():
+    """Clear all parquet cache files"""
+    if not os.path.exists(PARQUET_CACHE_DIR):
+        return
+
+    with _write_lock:
+        for filename in os.listdir(PARQUET_CACHE_DIR):
+            if filename.endswith(('.parquet', '.json')):
+                try:
+                    os.remove(os.path.join(PARQUET_CACHE_DIR, filename))
+                except OSError:
+                    pass
+
+
+def get_parquet_cache_stats():
+    """Get parquet cache statistics"""
+    if not os.path.exists(PARQUET_CACHE_DIR):
+        return {'total': 0, 'size_mb': 0}
+
+    total = 0
+    total_size = 0
+    for filename in os.listdir(PARQUET_CACHE_DIR):
+        if filename.endswith('.parquet'):
+            total += 1
+            total_size += os.path.getsize(os.path.join(PARQUET_CACHE_DIR, filename))
+
+    return {'total': total, 'size_mb': round(total_size / (1024 * 1024), 2)}
@@ -0,0 +1,129 @@
+"""
+Token-bucket rate limiter
+Cho phép burst tới `capacity` request, sau đó giới hạn ở `rate` request/giây
+
+Mọi đường gọi mạng (vnstock, Google Drive, yfinance) đi qua limiter
+theo host để không vượt quota upstream và không phải retry + sleep thủ công.
+"""
+import threading
+import time
+from urllib.parse import urlparse
+
+# (rate request/giây, burst) cho từng host
+HOST_LIMITS = {
+    'apipubaws.tcbs.com.vn': (5, 10),
+    'trading.vietcap.com.vn': (5, 10),
+    'drive.google.com': (2, 4),
+    'drive.usercontent.google.com': (2, 4),
+    'query1.finance.yahoo.com': (1, 2),
+}
+DEFAULT_HOST_LIMIT = (5, 10)
+
+# Host thực tế của từng nguồn vnstock
+SOURCE_HOSTS = {
+    'TCBS': 'apipubaws.tcbs.com.vn',
+    'VCI': 'trading.vietcap.com.vn',
+}
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe
+
+    reserve() trừ token ngay (có thể xuống âm) và trả về số giây phải chờ,
+    nên các caller được phục vụ theo thứ tự gọi và dùng được cả từ
+    thread (time.sleep) lẫn asyncio (await asyncio.sleep).
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens=1):
+        """Giữ chỗ `tokens` token, trả về số giây cần chờ trước khi gửi request"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            self.requests += 1
+            if self._tokens >= 0:
+                return 0.0
+            wait = -self._tokens / self.rate
+            self.throttled += 1
+            self.waited_seconds += wait
+            return wait
+
+    def acquire(self, tokens=1):
+        """Chặn thread hiện tại tới khi có token, trả về số giây đã chờ"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def get_stats(self):
+        """Lấy counters của bucket"""
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'capacity': self.capacity,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'waited_seconds': round(self.waited_seconds, 3)
+            }
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _normalize_host(host_or_url):
+    if '://' in host_or_url:
+        return urlparse(host_or_url).hostname or host_or_url
+    return SOURCE_HOSTS.get(host_or_url, host_or_url)
+
+
+def get_host_limiter(host_or_url):
+    """
+    Lấy TokenBucket dùng chung cho 1 host (tạo mới nếu chưa có)
+
+    Parameters:
+    -----------
+    host_or_url : str
+        Hostname, URL đầy đủ hoặc tên nguồn vnstock ('TCBS', 'VCI')
+    """
+    host = _normalize_host(host_or_url)
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            rate, capacity = HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT)
+            bucket = TokenBucket(rate, capacity)
+            _buckets[host] = bucket
+        return bucket
+
+
+def acquire_host(host_or_url):
+    """Chờ tới lượt gửi request tới host, trả về số giây đã chờ"""
+    return get_host_limiter(host_or_url).acquire()
+
+
+def get_rate_limiter_stats():
+    """
+    Lấy counters của tất cả host
+
+    Returns:
+    --------
+    dict : {host: {'rate', 'capacity', 'requests', 'throttled', 'waited_seconds'}}
+    """
+    with _buckets_lock:
+        buckets = dict(_buckets)
+    return {host: bucket.get_stats() for host, bucket in buckets.items()}
@@ -0,0 +1,69 @@
+"""
+Resample OHLCV ngày thành nến tuần/tháng ngay tại local
+Tránh gọi API riêng cho '1W'/'1M' và lưu trữ 3 lần cùng 1 mã
+"""
+import pandas as pd
+
+# Các khung thời gian được dựng từ dữ liệu '1D'
+DERIVED_RESOLUTIONS = ('1W', '1M')
+
+
+def get_bar_start(times, resolution):
+    """
+    Tính ngày đầu kỳ (nhãn của nến) cho từng timestamp
+
+    Tuần giao dịch HOSE chạy từ thứ Hai đến thứ Sáu nên nến tuần
+    được gắn nhãn theo thứ Hai, nến tháng theo ngày 1.
+
+    Parameters:
+    -----------
+    times : pd.Series
+        Cột datetime64
+    resolution : str
+        '1W' hoặc '1M'
+
+    Returns:
+    --------
+    pd.Series : Nhãn đầu kỳ (đã normalize về 00:00)
+    """
+    days = times.dt.normalize()
+    if resolution == '1W':
+        return days - pd.to_timedelta(days.dt.weekday, unit='D')
+    if resolution == '1M':
+        return days.dt.to_period('M').dt.start_time
+    raise ValueError(f"Unsupported resolution for resampling: {resolution}")
+
+
+def resample_ohlcv(df, resolution):
+    """
+    Dựng nến tuần/tháng từ nến ngày
+
+    open = open đầu tiên, high = max, low = min, close = close cuối cùng,
+    volume = tổng trong kỳ.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Nến ngày với các cột time, open, high, low, close, volume (sorted by time)
+    resolution : str
+        '1D', '1W' hoặc '1M'
+
+    Returns:
+    --------
+    pd.DataFrame : Cùng schema với df, mỗi dòng là 1 nến của resolution
+    """
+    if resolution not in DERIVED_RESOLUTIONS or df is None or df.empty:
+        return df
+
+    bar_start = get_bar_start(df['time'], resolution)
+
+    bars = df.groupby(bar_start.values, sort=True).agg(
+        open=('open', 'first'),
+        high=('high', 'max'),
+        low=('low', 'min'),
+        close=('close', 'last'),
+        volume=('volume', 'sum')
+    )
+    bars.index.name = 'time'
+
+    return bars.reset_index()
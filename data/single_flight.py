@@ -0,0 +1,61 @@
+"""
+Single-flight request coalescing
+Nhiều thread/session cùng cần 1 key thì chỉ thread đầu tiên gọi API,
+các thread còn lại chờ và dùng chung kết quả
+"""
+import threading
+from concurrent.futures import Future
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+_stats = {'calls': 0, 'coalesced': 0}
+
+
+def single_flight(key, fn, *args, **kwargs):
+    """
+    Gọi fn(*args, **kwargs), gộp các lời gọi đồng thời có cùng key
+
+    Parameters:
+    -----------
+    key : hashable
+        VD: (symbol, start_date, end_date, resolution)
+    fn : callable
+        Hàm thực hiện fetch thật
+
+    Returns:
+    --------
+    Kết quả của fn (exception cũng được chia sẻ cho các caller đang chờ)
+    """
+    with _inflight_lock:
+        _stats['calls'] += 1
+        future = _inflight.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight[key] = future
+        else:
+            _stats['coalesced'] += 1
+
+    if not is_owner:
+        return future.result()
+
+    try:
+        result = fn(*args, **kwargs)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def get_single_flight_stats():
+    """Lấy thống kê: tổng số lời gọi, số lời gọi được gộp, số key đang chạy"""
+    with _inflight_lock:
+        return {
+            'calls': _stats['calls'],
+            'coalesced': _stats['coalesced'],
+            'inflight': len(_inflight)
+        }
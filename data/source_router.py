@@ -0,0 +1,127 @@
+"""
+Source router - chọn nguồn dữ liệu vnstock theo độ trễ và tình trạng lỗi
+Mỗi nguồn có rolling latency, error rate và circuit breaker riêng
+"""
+import threading
+import time
+from collections import deque
+
+# Thứ tự mặc định khi chưa có số liệu (TCBS chạy được trên Cloud)
+DEFAULT_SOURCES = ['TCBS', 'VCI']
+
+# Số lần gọi gần nhất dùng để tính latency / error rate
+ROLLING_WINDOW = 20
+
+# Lỗi liên tiếp để mở circuit breaker, và thời gian breaker giữ trạng thái mở
+FAILURE_THRESHOLD = 3
+OPEN_SECONDS = 60
+
+_lock = threading.Lock()
+_health = {}
+
+
+def _get_health(source):
+    if source not in _health:
+        _health[source] = {
+            'latencies': deque(maxlen=ROLLING_WINDOW),
+            'outcomes': deque(maxlen=ROLLING_WINDOW),
+            'consecutive_failures': 0,
+            'opened_until': 0.0
+        }
+    return _health[source]
+
+
+def _summarize(health, now):
+    latencies = health['latencies']
+    outcomes = health['outcomes']
+    if health['opened_until'] > now:
+        state = 'open'
+    elif health['consecutive_failures'] >= FAILURE_THRESHOLD:
+        state = 'half-open'
+    else:
+        state = 'closed'
+
+    return {
+        'state': state,
+        'avg_latency': sum(latencies) / len(latencies) if latencies else None,
+        'error_rate': outcomes.count(False) / len(outcomes) if outcomes else 0.0,
+        'calls': len(outcomes),
+        'consecutive_failures': health['consecutive_failures'],
+        'retry_in': max(0.0, health['opened_until'] - now)
+    }
+
+
+def get_source_order(sources=None):
+    """
+    Sắp xếp nguồn: nguồn khỏe và nhanh trước, nguồn đang mở breaker bị bỏ qua
+
+    Nếu tất cả nguồn đều đang mở breaker thì vẫn trả về toàn bộ theo thứ tự
+    mặc định để không chặn hẳn việc lấy dữ liệu.
+
+    Returns:
+    --------
+    list : Danh sách source theo thứ tự nên thử
+    """
+    sources = list(sources or DEFAULT_SOURCES)
+    now = time.monotonic()
+
+    with _lock:
+        summaries = {source: _summarize(_get_health(source), now) for source in sources}
+
+    available = [s for s in sources if summaries[s]['state'] != 'open']
+    if not available:
+        return sources
+
+    def sort_key(source):
+        summary = summaries[source]
+        # Nguồn lỗi nhiều xếp sau, rồi tới latency; nguồn chưa có số liệu xếp sau
+        # các nguồn đã đo và giữ thứ tự mặc định giữa chúng
+        latency = summary['avg_latency']
+        return (summary['error_rate'] > 0.5, latency if latency is not None else float('inf'),
+                sources.index(source))
+
+    return sorted(available, key=sort_key)
+
+
+def record_success(source, latency):
+    """Ghi nhận 1 lần gọi thành công (latency tính bằng giây)"""
+    with _lock:
+        health = _get_health(source)
+        health['latencies'].append(latency)
+        health['outcomes'].append(True)
+        health['consecutive_failures'] = 0
+        health['opened_until'] = 0.0
+
+
+def record_failure(source, latency):
+    """Ghi nhận 1 lần gọi lỗi, mở circuit breaker nếu lỗi liên tiếp quá ngưỡng"""
+    with _lock:
+        health = _get_health(source)
+        health['latencies'].append(latency)
+        health['outcomes'].append(False)
+        health['consecutive_failures'] += 1
+        if health['consecutive_failures'] >= FAILURE_THRESHOLD:
+            health['opened_until'] = time.monotonic() + OPEN_SECONDS
+            print(f"[WARNING] Circuit breaker opened for {source} ({OPEN_SECONDS}s)")
+
+
+def get_router_state():
+    """
+    Lấy trạng thái router để kiểm tra / hiển thị
+
+    Returns:
+    --------
+    dict : {source: {'state', 'avg_latency', 'error_rate', 'calls',
+                     'consecutive_failures', 'retry_in'}}
+    """
+    now = time.monotonic()
+    with _lock:
+        for source in DEFAULT_SOURCES:
+            _get_health(source)
+        return {source: _summarize(health, now) for source, health in _health.items()}
+
+
+def reset_router():
+    """Xóa toàn bộ số liệu của router"""
+    with _lock:
+        _health.clear()
@@ -0,0 +1,246 @@
+"""
+Trend Index snapshot - bản lưu cục bộ của master dataset (Arrow IPC)
+
+- sources/{hash}.arrow : frame đã parse của từng nguồn Google Drive
+- combined.arrow    : dataset đã gộp, sort theo (symbol, date)
+- manifest.json     : version / hash nội dung từng nguồn, fingerprint
+                      và cache epoch của combined
+
+File Arrow IPC không nén nên đọc bằng memory map (gần như không tốn I/O
+khi khởi động lại).
+"""
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.feather as feather
+from data.parquet_cache import PARQUET_CACHE_DIR
+
+TREND_SNAPSHOT_DIR = os.path.join(PARQUET_CACHE_DIR, 'trend_index')
+
+# Số dòng tối đa mỗi record batch trong file combined
+SNAPSHOT_CHUNK_ROWS = 256 * 1024
+
+_lock = threading.Lock()
+
+
+def _path(*parts):
+    return os.path.join(TREND_SNAPSHOT_DIR, *parts)
+
+
+def _write_table(df, path, chunksize=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=chunksize)
+    os.replace(tmp_path, path)
+
+
+def _read_table(path):
+    # memory_map + split_blocks: cột số được dùng trực tiếp từ vùng nhớ map
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def load_manifest():
+    """
+    Đọc manifest của snapshot
+
+    Returns:
+    --------
+    dict : {'sources': {url: {...}}, 'combined': {...} or None}
+    """
+    try:
+        with open(_path('manifest.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'sources': {}, 'combined': None}
+    except Exception as e:
+        print(f"[WARNING] Invalid Trend Index snapshot manifest: {e}")
+        return {'sources': {}, 'combined': None}
+
+
+def _update_manifest(update):
+    with _lock:
+        manifest = load_manifest()
+        update(manifest)
+        os.makedirs(TREND_SNAPSHOT_DIR, exist_ok=True)
+        tmp_path = _path(f"manifest.json.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, _path('manifest.json'))
+
+
+def _source_file(source_url):
+    # Tên file cố định theo URL (các nguồn được lưu song song từ nhiều thread)
+    return f"{hashlib.md5(source_url.encode('utf-8')).hexdigest()[:16]}.arrow"
+
+
+def get_source_entry(source_url):
+    """Thông tin đã lưu của 1 nguồn (version, content_hash, rows, ...) hoặc None"""
+    return load_manifest()['sources'].get(source_url)
+
+
+def load_source_frame(source_url):
+    """
+    Đọc frame đã parse của 1 nguồn
+
+    Returns:
+    --------
+    pd.DataFrame or None : attrs['source_version'] = version đã lưu
+    """
+    entry = get_source_entry(source_url)
+    if entry is None:
+        return None
+
+    try:
+        df = _read_table(_path('sources', entry['file']))
+    except Exception as e:
+        print(f"[WARNING] Failed to read snapshot for {source_url}: {e}")
+        return None
+
+    df.attrs['source_version'] = entry['version']
+    return df
+
+
+def save_source_frame(source_url, df, version, content_hash=None, **validators):
+    """
+    Lưu frame đã parse của 1 nguồn
+
+    Parameters:
+    -----------
+    version : str
+        Version dùng cho fingerprint (ETag / Last-Modified / hash nội dung)
+    content_hash : str, optional
+        Hash nội dung đã tải, để lần sau biết nguồn có đổi không
+    **validators :
+        Thông tin thêm lưu cùng nguồn (VD: etag, last_modified)
+    """
+    filename = _source_file(source_url)
+    try:
+        _write_table(df, _path('sources', filename))
+    except Exception as e:
+        print(f"[WARNING] Failed to write snapshot for {source_url}: {e}")
+        return
+
+    def update(manifest):
+        manifest['sources'][source_url] = {
+            'file': filename,
+            'version': version,
+            'content_hash': content_hash,
+            'rows': len(df),
+            'saved_at': datetime.now().isoformat(),
+            **validators,
+        }
+    _update_manifest(update)
+
+
+def update_source_validators(source_url, **validators):
+    """Cập nhật validator (etag, last_modified) của nguồn mà không ghi lại frame"""
+    def update(manifest):
+        entry = manifest['sources'].get(source_url)
+        if entry is not None:
+            entry.update(validators, saved_at=datetime.now().isoformat())
+    _update_manifest(update)
+
+
+def get_conditional_headers(source_url):
+    """
+    Header cho conditional GET dựa trên validator đã lưu của nguồn
+
+    Returns:
+    --------
+    dict : If-None-Match / If-Modified-Since (rỗng nếu chưa có frame lưu)
+    """
+    entry = get_source_entry(source_url)
+    if entry is None or not os.path.exists(_path('sources', entry['file'])):
+        return {}
+
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def save_combined_snapshot(df, fingerprint, source_versions, cache_epoch):
+    """
+    Lưu dataset đã gộp (df phải được sort theo symbol, date)
+
+    Parameters:
+    -----------
+    fingerprint : str
+        Fingerprint của dataset (xem build_dataset_fingerprint ở trang Trend Index)
+    source_versions : dict
+        {url: version} của các nguồn tạo nên dataset
+    cache_epoch : str
+        Cache epoch lúc ghi; trong cùng epoch có thể dùng snapshot mà không tải lại
+    """
+    try:
+        _write_table(df, _path('combined.arrow'), chunksize=SNAPSHOT_CHUNK_ROWS)
+    except Exception as e:
+        print(f"[WARNING] Failed to write Trend Index snapshot: {e}")
+        return
+
+    def update(manifest):
+        manifest['combined'] = {
+            'fingerprint': fingerprint,
+            'source_versions': source_versions,
+            'cache_epoch': cache_epoch,
+            'rows': len(df),
+            'saved_at': datetime.now().isoformat(),
+        }
+    _update_manifest(update)
+    print(f"[SUCCESS] Trend Index snapshot saved: {len(df):,} rows")
+
+
+def _read_combined(combined):
+    try:
+        df = _read_table(_path('combined.arrow'))
+    except Exception as e:
+        print(f"[WARNING] Failed to read Trend Index snapshot: {e}")
+        return None
+
+    df.attrs['fingerprint'] = combined['fingerprint']
+    return df
+
+
+def load_combined_snapshot(cache_epoch):
+    """
+    Đọc dataset đã gộp (memory map) nếu snapshot được ghi / xác nhận trong cache_epoch
+
+    Returns:
+    --------
+    pd.DataFrame or None : attrs['fingerprint'] = fingerprint của snapshot
+    """
+    combined = load_manifest().get('combined')
+    if not combined or combined.get('cache_epoch') != cache_epoch:
+        return None
+    return _read_combined(combined)
+
+
+def reuse_combined_snapshot(source_versions, cache_epoch):
+    """
+    Dùng lại dataset đã gộp khi các nguồn không đổi version
+
+    Snapshot tạo từ đúng source_versions được xác nhận cho cache_epoch mới
+    (lần load sau trong epoch này đọc thẳng bằng load_combined_snapshot).
+
+    Returns:
+    --------
+    pd.DataFrame or None
+    """
+    combined = load_manifest().get('combined')
+    if not combined or combined.get('source_versions') != source_versions:
+        return None
+
+    df = _read_combined(combined)
+    if df is not None:
+        def update(manifest):
+            if manifest.get('combined'):
+                manifest['combined']['cache_epoch'] = cache_epoch
+        _update_manifest(update)
+    return df
@@ -0,0 +1,115 @@
+"""
+Market breadth engine - tính bề rộng thị trường cho mọi ngày trong 1 lần
+Thay cho vòng lặp groupby('date') + 9 phép đếm trên từng ngày
+"""
+import numpy as np
+import pandas as pd
+
+
+def calculate_breadth_components(df):
+    """
+    Tính các thành phần bề rộng thị trường theo ngày
+
+    Mỗi chỉ số theo ngày là 1 np.bincount trên mã ngày (factorize),
+    nên chi phí là O(số dòng) bất kể số ngày / số mã.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Output của calculate_panel_indicators (cần date, close, prev_close,
+        volume; SMA_50, SMA_200, RSI_14, MACD_Crossover nếu có)
+
+    Returns:
+    --------
+    pd.DataFrame : index 'Date' (tăng dần), các cột A-D Net, Up Vol, Down Vol,
+        TRIN, % > MA50, % > MA200, % RSI > 50, % MACD Crossover
+    """
+    date_codes, dates = pd.factorize(df['date'], sort=True)
+    n_dates = len(dates)
+
+    def count(mask):
+        return np.bincount(date_codes, weights=np.asarray(mask, dtype=float), minlength=n_dates)
+
+    close = df['close'].to_numpy(dtype=float)
+    prev_close = df['prev_close'].to_numpy(dtype=float)
+    volume = df['volume'].to_numpy(dtype=float)
+
+    advancing = close > prev_close
+    declining = close < prev_close
+    total_stocks = np.bincount(date_codes, minlength=n_dates)
+
+    advances = count(advancing).astype('int64')
+    declines = count(declining).astype('int64')
+    up_volume = count(np.where(advancing, volume, 0))
+    down_volume = count(np.where(declining, volume, 0))
+
+    # Mẫu số = 0 thì chia cho 1 (giống logic cũ)
+    ad_ratio = advances / np.where(declines > 0, declines, 1)
+    ud_vol_ratio = up_volume / np.where(down_volume > 0, down_volume, 1)
+    trin = np.divide(ad_ratio, ud_vol_ratio, out=np.zeros(n_dates), where=ud_vol_ratio > 0)
+
+    def fraction(column, condition):
+        if column not in df.columns:
+            return np.zeros(n_dates)
+        return count(condition(df[column])) / total_stocks
+
+    breadth_df = pd.DataFrame({
+        'A-D Net': advances - declines,
+        'Up Vol': up_volume,
+        'Down Vol': down_volume,
+        'TRIN': trin,
+        '% > MA50': fraction('SMA_50', lambda sma: df['close'] > sma),
+        '% > MA200': fraction('SMA_200', lambda sma: df['close'] > sma),
+        '% RSI > 50': fraction('RSI_14', lambda rsi: rsi > 50),
+        '% MACD Crossover': fraction('MACD_Crossover', lambda crossover: crossover == True),  # noqa: E712
+    }, index=pd.Index(dates, name='Date'))
+
+    return breadth_df
+
+
+def rolling_trend_score(series, window=10, min_periods=5):
+    """
+    Điểm xu hướng -2..+2 theo độ dốc hồi quy tuyến tính trên cửa sổ trượt
+
+    Closed form thay cho linregress trên từng cửa sổ: với x = 0..window-1,
+    slope = sum((x - x_mean) * y) / sum((x - x_mean)^2), tức là 1 tích vô hướng
+    của mỗi cửa sổ với vector trọng số cố định. Độ dốc được chuẩn hóa theo
+    trung bình cửa sổ rồi chia mức:
+    > 0.05 (+2), > 0.01 (+1), < -0.05 (-2), < -0.01 (-1), còn lại 0.
+
+    Parameters:
+    -----------
+    series : pd.Series
+        VD: A-D Line
+    window : int
+        Độ dài cửa sổ (giống rolling(window))
+    min_periods : int
+        Cửa sổ ngắn hơn số điểm này cho NaN
+
+    Returns:
+    --------
+    pd.Series : Điểm (float, NaN khi cửa sổ chưa đủ dữ liệu)
+    """
+    values = series.to_numpy(dtype=float)
+    scores = np.full(len(values), np.nan)
+
+    if window < min_periods or len(values) < window:
+        return pd.Series(scores, index=series.index)
+
+    x_centered = np.arange(window) - (window - 1) / 2
+    weights = x_centered / (x_centered ** 2).sum()
+
+    windows = np.lib.stride_tricks.sliding_window_view(values, window)
+    slope = windows @ weights
+    window_mean = windows.mean(axis=1)
+    normalized_slope = np.divide(slope, window_mean, out=np.zeros_like(slope), where=window_mean != 0)
+
+    window_scores = np.select(
+        [normalized_slope > 0.05, normalized_slope > 0.01, normalized_slope < -0.05, normalized_slope < -0.01],
+        [2, 1, -2, -1], default=0
+    ).astype(float)
+    # Giống rolling(window).apply: cửa sổ có NaN -> NaN
+    window_scores[np.isnan(windows).any(axis=1)] = np.nan
+
+    scores[window - 1:] = window_scores
+    return pd.Series(scores, index=series.index)
@@ -0,0 +1,220 @@
+"""
+Indicator graph - registry các node chỉ báo khai báo input của nhau
+
+Mỗi node là 1 hàm (graph, *params) lấy input qua graph.get(...), nên các
+node dùng chung (close.diff, rolling mean, EWM, True Range, ...) chỉ được
+tính 1 lần cho mỗi DataFrame, và chỉ khi có chỉ báo thực sự cần tới.
+
+VD: sma 20 được dùng lại cho Bollinger middle, ema 12/26 cho MACD,
+True Range / +DM / -DM chung cho ADX và +DI / -DI.
+"""
+import numpy as np
+import pandas as pd
+
+INDICATOR_NODES = {}
+
+
+def indicator_node(name):
+    """Decorator đăng ký 1 node vào INDICATOR_NODES"""
+    def register(fn):
+        INDICATOR_NODES[name] = fn
+        return fn
+    return register
+
+
+class IndicatorGraph:
+    """
+    Đánh giá lazy các node chỉ báo trên 1 DataFrame OHLCV, có memoize
+
+    Usage:
+    ------
+    graph = IndicatorGraph(df)
+    graph.get('sma', 20)
+    graph.get('macd_signal', 12, 26, 9)
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._values = {}
+
+    def get(self, name, *params):
+        key = (name,) + params
+        if key not in self._values:
+            self._values[key] = INDICATOR_NODES[name](self, *params)
+        return self._values[key]
+
+    def source(self, source):
+        """Input là tên cột ('close') hoặc key của node khác (('macd', 12, 26))"""
+        if isinstance(source, tuple):
+            return self.get(*source)
+        return self.get('column', source)
+
+    @property
+    def computed_nodes(self):
+        return list(self._values)
+
+
+# --- Primitive nodes ---
+
+@indicator_node('column')
+def _column(graph, column):
+    return graph.df[column]
+
+
+@indicator_node('diff')
+def _diff(graph, source):
+    return graph.source(source).diff()
+
+
+@indicator_node('shift')
+def _shift(graph, source):
+    return graph.source(source).shift(1)
+
+
+@indicator_node('rolling_mean')
+def _rolling_mean(graph, source, period):
+    return graph.source(source).rolling(window=period, min_periods=1).mean()
+
+
+@indicator_node('rolling_std')
+def _rolling_std(graph, source, period):
+    return graph.source(source).rolling(window=period, min_periods=1).std()
+
+
+@indicator_node('rolling_min')
+def _rolling_min(graph, source, period):
+    return graph.source(source).rolling(window=period, min_periods=1).min()
+
+
+@indicator_node('rolling_max')
+def _rolling_max(graph, source, period):
+    return graph.source(source).rolling(window=period, min_periods=1).max()
+
+
+@indicator_node('ewm_span')
+def _ewm_span(graph, source, span):
+    return graph.source(source).ewm(span=span, adjust=False).mean()
+
+
+@indicator_node('wilder')
+def _wilder(graph, source, period):
+    # Wilder's smoothing (EMA với alpha = 1/period)
+    return graph.source(source).ewm(alpha=1/period, min_periods=period, adjust=False).mean()
+
+
+# --- Moving averages / RSI / MACD / Bollinger / Stochastic ---
+
+@indicator_node('sma')
+def _sma(graph, period):
+    return graph.get('rolling_mean', 'close', period)
+
+
+@indicator_node('ema')
+def _ema(graph, period):
+    return graph.get('ewm_span', 'close', period)
+
+
+@indicator_node('gain')
+def _gain(graph):
+    delta = graph.get('diff', 'close')
+    return delta.where(delta > 0, 0)
+
+
+@indicator_node('loss')
+def _loss(graph):
+    delta = graph.get('diff', 'close')
+    return -delta.where(delta < 0, 0)
+
+
+@indicator_node('rsi')
+def _rsi(graph, period):
+    rs = graph.get('rolling_mean', ('gain',), period) / graph.get('rolling_mean', ('loss',), period)
+    return 100 - (100 / (1 + rs))
+
+
+@indicator_node('macd')
+def _macd(graph, fast, slow):
+    return graph.get('ema', fast) - graph.get('ema', slow)
+
+
+@indicator_node('macd_signal')
+def _macd_signal(graph, fast, slow, signal):
+    return graph.get('ewm_span', ('macd', fast, slow), signal)
+
+
+@indicator_node('macd_histogram')
+def _macd_histogram(graph, fast, slow, signal):
+    return graph.get('macd', fast, slow) - graph.get('macd_signal', fast, slow, signal)
+
+
+@indicator_node('bb_upper')
+def _bb_upper(graph, period, std):
+    return graph.get('sma', period) + (graph.get('rolling_std', 'close', period) * std)
+
+
+@indicator_node('bb_lower')
+def _bb_lower(graph, period, std):
+    return graph.get('sma', period) - (graph.get('rolling_std', 'close', period) * std)
+
+
+@indicator_node('stoch_k')
+def _stoch_k(graph, k_period):
+    low_min = graph.get('rolling_min', 'low', k_period)
+    high_max = graph.get('rolling_max', 'high', k_period)
+    return 100 * (graph.get('column', 'close') - low_min) / (high_max - low_min)
+
+
+@indicator_node('stoch_d')
+def _stoch_d(graph, k_period, d_period):
+    return graph.get('rolling_mean', ('stoch_k', k_period), d_period)
+
+
+# --- ADX / DI ---
+
+@indicator_node('true_range')
+def _true_range(graph):
+    high, low = graph.get('column', 'high'), graph.get('column', 'low')
+    prev_close = graph.get('shift', 'close')
+
+    high_low = high - low
+    high_close = np.abs(high - prev_close)
+    low_close = np.abs(low - prev_close)
+
+    return pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+
+
+@indicator_node('plus_dm')
+def _plus_dm(graph):
+    high_diff = graph.get('diff', 'high')
+    low_diff = -graph.get('diff', 'low')
+    plus_dm = np.where((high_diff > low_diff) & (high_diff > 0), high_diff, 0)
+    return pd.Series(plus_dm, index=graph.df.index)
+
+
+@indicator_node('minus_dm')
+def _minus_dm(graph):
+    high_diff = graph.get('diff', 'high')
+    low_diff = -graph.get('diff', 'low')
+    minus_dm = np.where((low_diff > high_diff) & (low_diff > 0), low_diff, 0)
+    return pd.Series(minus_dm, index=graph.df.index)
+
+
+@indicator_node('plus_di')
+def _plus_di(graph, period):
+    return 100 * (graph.get('wilder', ('plus_dm',), period) / graph.get('wilder', ('true_range',), period))
+
+
+@indicator_node('minus_di')
+def _minus_di(graph, period):
+    return 100 * (graph.get('wilder', ('minus_dm',), period) / graph.get('wilder', ('true_range',), period))
+
+
+@indicator_node('dx')
+def _dx(graph, period):
+    plus_di, minus_di = graph.get('plus_di', period), graph.get('minus_di', period)
+    return 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+
+
+@indicator_node('adx')
+def _adx(graph, period):
+    return graph.get('wilder', ('dx', period), period)
@@ -0,0 +1,169 @@
+"""
+Lazy indicators - chỉ tính indicator khi được truy cập lần đầu
+
+Thay cho việc tính sẵn 12 MA + RSI + MACD + Bollinger cho mọi mã.
+Kết quả được memoize theo (fingerprint của data, node indicator, params)
+nên cùng 1 data (VD: rerun Streamlit) không phải tính lại.
+"""
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+import pandas as pd
+from indicators.graph import IndicatorGraph
+
+# Tên indicator cố định -> node trong IndicatorGraph
+INDICATOR_ALIASES = {
+    'macd': ('macd', 12, 26),
+    'macd_signal': ('macd_signal', 12, 26, 9),
+    'macd_histogram': ('macd_histogram', 12, 26, 9),
+    'bb_upper': ('bb_upper', 20, 2),
+    'bb_middle': ('sma', 20),
+    'bb_lower': ('bb_lower', 20, 2),
+}
+
+# Tên có chu kỳ tùy ý: sma37, ema12, rsi7, adx14
+_PERIOD_PATTERN = re.compile(r'^(sma|ema|rsi|adx)(\d+)$')
+
+# Số Series giữ lại tối đa trong memo dùng chung
+MAX_MEMO_ENTRIES = 512
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def parse_indicator_name(name):
+    """
+    Đổi tên indicator sang key node trong IndicatorGraph
+
+    Returns:
+    --------
+    tuple or None : VD 'sma37' -> ('sma', 37), 'macd' -> ('macd', 12, 26)
+    """
+    if name in INDICATOR_ALIASES:
+        return INDICATOR_ALIASES[name]
+
+    match = _PERIOD_PATTERN.match(str(name).lower())
+    if match and int(match.group(2)) > 0:
+        return (match.group(1), int(match.group(2)))
+
+    return None
+
+
+def copy_on_write_enabled():
+    """pandas >= 3 luôn bật Copy-on-Write; pandas 2.x chỉ khi set mode.copy_on_write = True"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return pd.get_option('mode.copy_on_write') is True
+
+
+def checkout_copy(obj):
+    """
+    Bản sao DataFrame / Series dùng chung để trả cho caller
+
+    Có Copy-on-Write: shallow copy (không copy dữ liệu, ghi vào bản sao
+    không ảnh hưởng bản gốc). Không có CoW: deep copy, vì shallow copy
+    vẫn dùng chung buffer và ghi in-place sẽ sửa bản dùng chung.
+    """
+    if obj is None:
+        return None
+    return obj.copy(deep=not copy_on_write_enabled())
+
+
+def get_frame_fingerprint(df):
+    """Fingerprint nội dung OHLCV (kể cả index) của DataFrame"""
+    columns = [col for col in ('time', 'open', 'high', 'low', 'close', 'volume') if col in df.columns]
+    return int(pd.util.hash_pandas_object(df[columns], index=True).sum())
+
+
+class LazyIndicators(Mapping):
+    """
+    Dict-like container: indicators['sma20'], indicators.get('ema37')
+
+    Chỉ chứa các indicator đã được truy cập (len/iter), nhưng mọi tên
+    parse được đều truy cập được. Thread-safe (có thể dùng chung giữa các
+    session); Series trả về là bản sao qua checkout_copy.
+    """
+
+    def __init__(self, df, fingerprint=None):
+        self.df = df
+        self.fingerprint = fingerprint if fingerprint is not None else get_frame_fingerprint(df)
+        self._graph = None
+        self._accessed = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        node = parse_indicator_name(name)
+        if node is None:
+            raise KeyError(name)
+
+        with self._lock:
+            series = self._get_series(name, node)
+        return checkout_copy(series)
+
+    def _get_series(self, name, node):
+        # Gọi khi đang giữ self._lock
+        if name in self._accessed:
+            return self._accessed[name]
+
+        memo_key = (self.fingerprint,) + node
+        with _memo_lock:
+            series = _memo.get(memo_key)
+            if series is not None:
+                _memo.move_to_end(memo_key)
+
+        if series is None:
+            if self._graph is None:
+                self._graph = IndicatorGraph(self.df)
+            try:
+                series = self._graph.get(*node)
+            except Exception as e:
+                print(f"[WARNING] Failed to calculate indicator {name}: {e}")
+                raise KeyError(name) from e
+
+            with _memo_lock:
+                _memo[memo_key] = series
+                while len(_memo) > MAX_MEMO_ENTRIES:
+                    _memo.popitem(last=False)
+
+        self._accessed[name] = series
+        return series
+
+    def memory_usage(self):
+        """Dung lượng (byte) các Series đã tính, không copy"""
+        with self._lock:
+            return sum(int(series.memory_usage(index=True)) for series in self._accessed.values())
+
+    def __getstate__(self):
+        # Lock không pickle được; graph tạo lại khi cần
+        with self._lock:
+            return {'df': self.df, 'fingerprint': self.fingerprint, '_accessed': dict(self._accessed)}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _graph=None, _lock=threading.Lock())
+
+    def __contains__(self, name):
+        return parse_indicator_name(name) is not None
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._accessed))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._accessed)
+
+    def __repr__(self):
+        return f"LazyIndicators(rows={len(self.df)}, computed={list(self)})"
+
+
+def clear_indicator_memo():
+    """Xóa memo indicator dùng chung"""
+    with _memo_lock:
+        _memo.clear()
+
+
+def get_indicator_memo_stats():
+    """Lấy thống kê memo"""
+    with _memo_lock:
+        return {'entries': len(_memo), 'max_entries': MAX_MEMO_ENTRIES}
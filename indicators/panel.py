@@ -0,0 +1,168 @@
+"""
+Panel indicator engine - tính chỉ báo cho toàn bộ universe trong 1 lần
+Thay cho df.groupby('symbol').apply(...) gọi từng hàm indicator theo mã
+"""
+import numpy as np
+import pandas as pd
+
+
+class _Panel:
+    """
+    Chuyển long frame (symbol, date, ...) sang ma trận 2-D (bar × symbol)
+
+    Hàng thứ i của cột symbol là bar thứ i của mã đó (theo thứ tự trong df),
+    nên rolling/ewm/shift trên ma trận cho kết quả giống hệt tính riêng từng
+    mã, kể cả khi các mã có số phiên khác nhau (niêm yết sau, tạm ngừng GD).
+    Phần thiếu ở cuối mỗi cột là NaN và bị bỏ khi trả về long format.
+    """
+
+    def __init__(self, symbols):
+        self.codes, uniques = pd.factorize(symbols)
+        self.rows = symbols.groupby(self.codes).cumcount().to_numpy()
+        self.shape = (int(self.rows.max()) + 1 if len(self.rows) else 0, len(uniques))
+
+    def wide(self, values):
+        matrix = np.full(self.shape, np.nan)
+        matrix[self.rows, self.codes] = np.asarray(values, dtype=float)
+        return pd.DataFrame(matrix)
+
+    def long(self, matrix):
+        return np.asarray(matrix)[self.rows, self.codes]
+
+
+# Kiểu dữ liệu các cột không phải float32 trong compact mode
+COMPACT_DTYPES = {
+    'Raw Score': 'int8',
+    'MACD_Bull': bool,
+    'MACD_Crossover': bool,
+}
+
+
+def _wilder(frame, period):
+    return frame.ewm(alpha=1/period, min_periods=period, adjust=False).mean()
+
+
+def calculate_panel_indicators(df, compact=False):
+    """
+    Tính toàn bộ chỉ báo + Raw Score / Trend Score cho nhiều mã cùng lúc
+
+    Kết quả giống calculate_sma/calculate_rsi/calculate_macd/
+    calculate_bollinger_bands/calculate_adx áp dụng cho từng mã.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Long format với các cột symbol, date, open, high, low, close, volume,
+        đã sort theo (symbol, date)
+    compact : bool
+        True: chỉ báo float32, Raw Score int8, MACD_Bull / MACD_Crossover bool
+        (MACD_Crossover = False ở bar đầu). Vẫn tính bằng float64, chỉ ép kiểu
+        khi trả về, nên chỉ lệch ở mức làm tròn float32.
+
+    Returns:
+    --------
+    pd.DataFrame : df + SMA_20/50/100/200, RSI_14, MACD_12_26_9, MACDs_12_26_9,
+        MACDh_12_26_9, BBU/BBM/BBL_20_2.0, VOL_SMA_20, ADX_14, Raw Score,
+        Trend Score, prev_close, MACD_Bull, MACD_Crossover
+    """
+    panel = _Panel(df['symbol'])
+    close = panel.wide(df['close'])
+    open_ = panel.wide(df['open'])
+    high = panel.wide(df['high'])
+    low = panel.wide(df['low'])
+    volume = panel.wide(df['volume'])
+
+    # Moving averages
+    sma = {period: close.rolling(window=period, min_periods=1).mean() for period in (20, 50, 100, 200)}
+
+    # RSI (SMA of gains/losses, same as calculate_rsi)
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14, min_periods=1).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=1).mean()
+    rsi = 100 - (100 / (1 + gain / loss))
+
+    # MACD 12/26/9
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    macd_signal = macd.ewm(span=9, adjust=False).mean()
+    macd_hist = macd - macd_signal
+
+    # Bollinger Bands 20/2
+    bb_std = close.rolling(window=20, min_periods=1).std()
+    bb_upper = sma[20] + bb_std * 2
+    bb_lower = sma[20] - bb_std * 2
+
+    vol_sma = volume.rolling(window=20, min_periods=1).mean()
+
+    # ADX 14 (Wilder smoothing, same as calculate_adx)
+    prev_close = close.shift(1)
+    tr = np.fmax(np.fmax(high - low, (high - prev_close).abs()), (low - prev_close).abs())
+    high_diff = high - high.shift(1)
+    low_diff = low.shift(1) - low
+    plus_dm = high_diff.where((high_diff > low_diff) & (high_diff > 0), 0)
+    minus_dm = low_diff.where((low_diff > high_diff) & (low_diff > 0), 0)
+    tr_smooth = _wilder(tr, 14)
+    plus_di = 100 * (_wilder(plus_dm, 14) / tr_smooth)
+    minus_di = 100 * (_wilder(minus_dm, 14) / tr_smooth)
+    dx = 100 * (plus_di - minus_di).abs() / (plus_di + minus_di)
+    adx = _wilder(dx, 14)
+
+    # --- BALANCED Scoring Logic (No Bias), same weights as the per-symbol version ---
+    raw_score = (
+        np.where(close > sma[200], 3, -3)
+        + np.where(close > sma[100], 2, -2)
+        + np.where(sma[100] > sma[200], 2, -2)
+        + np.where(close > sma[50], 2, -2)
+        + np.where(close > sma[20], 1, -1)
+        + np.where(sma[20] > sma[50], 1, -1)
+        + np.select([rsi > 70, rsi > 50, rsi < 30, rsi < 50], [2, 1, -2, -1], default=0)
+    )
+
+    macd_prev = macd.shift(1)
+    signal_prev = macd_signal.shift(1)
+    macd_bullish = (macd > macd_signal) & (macd_prev <= signal_prev)
+    macd_bearish = (macd < macd_signal) & (macd_prev >= signal_prev)
+    raw_score += np.where(macd_bullish, 2, 0) + np.where(macd_bearish, -2, 0)
+
+    adx_valid = adx.notna()
+    raw_score += np.select(
+        [adx_valid & (adx > 40), adx_valid & (adx > 25), adx_valid & (adx < 20)],
+        [1, 0, -1], default=0
+    )
+
+    above_avg_volume = volume > vol_sma
+    raw_score += np.where((close > open_) & above_avg_volume, 2, 0)
+    raw_score += np.where((close < open_) & above_avg_volume, -2, 0)
+
+    raw_score += np.where(close > bb_upper, 1, 0) + np.where(close < bb_lower, -1, 0)
+
+    raw_score = pd.DataFrame(raw_score.astype('int64'))
+    trend_score = raw_score.rolling(window=10).mean()
+
+    macd_bull = macd > macd_signal
+    # Giống bool Series.diff(): object dtype, NaN ở bar đầu tiên, True khi đổi trạng thái
+    macd_crossover = (macd_bull != macd_bull.shift(1)).astype(object)
+    macd_crossover.iloc[0] = np.nan
+
+    columns = {
+        'SMA_20': sma[20], 'SMA_50': sma[50], 'SMA_100': sma[100], 'SMA_200': sma[200],
+        'RSI_14': rsi,
+        'MACD_12_26_9': macd, 'MACDs_12_26_9': macd_signal, 'MACDh_12_26_9': macd_hist,
+        'BBU_20_2.0': bb_upper, 'BBM_20_2.0': sma[20], 'BBL_20_2.0': bb_lower,
+        'VOL_SMA_20': vol_sma,
+        'ADX_14': adx,
+        'Raw Score': raw_score,
+        'Trend Score': trend_score,
+        'prev_close': prev_close,
+        'MACD_Bull': macd_bull,
+        'MACD_Crossover': macd_crossover,
+    }
+
+    if compact:
+        columns['Raw Score'] = raw_score.astype('int8')
+        columns['MACD_Crossover'] = macd_crossover.fillna(False).astype(bool)
+        return df.assign(**{
+            name: panel.long(matrix).astype(COMPACT_DTYPES.get(name, 'float32'))
+            for name, matrix in columns.items()
+        })
+
+    return df.assign(**{name: panel.long(matrix) for name, matrix in columns.items()})
@@ -0,0 +1,545 @@
+"""
+Streaming indicators - tính chỉ báo tăng dần từng bar (O(1) mỗi update)
+
+Mỗi calculator được seed từ lịch sử (from_history) rồi update(bar) khi có
+bar mới, cho kết quả giống các hàm trong indicators/technical.py và
+indicators/adx.py. State serialize được (to_dict/from_dict) để lưu cạnh
+parquet store.
+
+Bar cuối của store có thể còn đang hình thành (giá thay đổi trong phiên),
+nên state chỉ commit các bar đã đóng; bar cuối được tính trên bản sao của
+state (xem advance_indicators).
+"""
+import copy
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+
+def _div(a, b):
+    """Chia theo IEEE như pandas (x/0 -> inf, 0/0 -> NaN)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(a) / np.float64(b))
+
+
+class _EWM:
+    """
+    Một bước ewm(adjust=False, ignore_na=False).mean() của pandas
+
+    Giữ nguyên cách pandas xử lý NaN: bar NaN vẫn làm giảm trọng số
+    của giá trị cũ, và output là NaN cho tới khi đủ min_periods quan sát.
+    """
+
+    def __init__(self, alpha, min_periods=0):
+        self.alpha = alpha
+        self.min_periods = max(min_periods, 1)
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, value):
+        is_observation = not math.isnan(value)
+        self.nobs += is_observation
+
+        if not math.isnan(self.weighted):
+            self.old_wt *= 1.0 - self.alpha
+            if is_observation:
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + self.alpha * value) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        elif is_observation:
+            self.weighted = value
+
+        return self.value
+
+    @property
+    def value(self):
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+    def to_dict(self):
+        return {'alpha': self.alpha, 'min_periods': self.min_periods,
+                'weighted': self.weighted, 'old_wt': self.old_wt, 'nobs': self.nobs}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['alpha'], data['min_periods'])
+        state.weighted, state.old_wt, state.nobs = data['weighted'], data['old_wt'], data['nobs']
+        return state
+
+
+class _RollingWindow:
+    """
+    Rolling mean/std (min_periods=1, ddof=1) với Welford add/remove như pandas
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+
+    def _add(self, value):
+        self.nobs += 1
+        delta = value - self.mean_x
+        self.mean_x += delta / self.nobs
+        self.ssqdm_x += delta * (value - self.mean_x)
+
+    def _remove(self, value):
+        self.nobs -= 1
+        if self.nobs:
+            delta = value - self.mean_x
+            self.mean_x -= delta / self.nobs
+            self.ssqdm_x -= delta * (value - self.mean_x)
+        else:
+            self.mean_x = self.ssqdm_x = 0.0
+
+    def update(self, value):
+        self.values.append(value)
+        if not math.isnan(value):
+            self._add(value)
+        if len(self.values) > self.period:
+            dropped = self.values.popleft()
+            if not math.isnan(dropped):
+                self._remove(dropped)
+
+    @property
+    def mean(self):
+        return self.mean_x if self.nobs else NAN
+
+    @property
+    def std(self):
+        if self.nobs < 2:
+            return NAN
+        return math.sqrt(max(self.ssqdm_x, 0.0) / (self.nobs - 1))
+
+    def to_dict(self):
+        return {'period': self.period, 'values': list(self.values), 'nobs': self.nobs,
+                'mean_x': self.mean_x, 'ssqdm_x': self.ssqdm_x}
+
+    @classmethod
+    def from_dict(cls, data):
+        window = cls(data['period'])
+        window.values = deque(data['values'])
+        window.nobs, window.mean_x, window.ssqdm_x = data['nobs'], data['mean_x'], data['ssqdm_x']
+        return window
+
+
+class _RollingExtreme:
+    """Rolling min hoặc max (min_periods=1) bằng monotonic deque"""
+
+    def __init__(self, period, is_max):
+        self.period = period
+        self.is_max = is_max
+        self.count = 0
+        self.candidates = deque()  # (index, value)
+
+    def update(self, value):
+        index = self.count
+        self.count += 1
+        if not math.isnan(value):
+            while self.candidates and (
+                    self.candidates[-1][1] <= value if self.is_max else self.candidates[-1][1] >= value):
+                self.candidates.pop()
+            self.candidates.append((index, value))
+        while self.candidates and self.candidates[0][0] <= index - self.period:
+            self.candidates.popleft()
+
+    @property
+    def value(self):
+        return self.candidates[0][1] if self.candidates else NAN
+
+    def to_dict(self):
+        return {'period': self.period, 'is_max': self.is_max, 'count': self.count,
+                'candidates': [list(item) for item in self.candidates]}
+
+    @classmethod
+    def from_dict(cls, data):
+        extreme = cls(data['period'], data['is_max'])
+        extreme.count = data['count']
+        extreme.candidates = deque(tuple(item) for item in data['candidates'])
+        return extreme
+
+
+class StreamingIndicator:
+    """
+    Base class: from_history(df) để seed, update(bar) cho mỗi bar mới
+
+    bar là dict-like có các key 'close' (và 'high', 'low' nếu cần).
+    """
+
+    name = None
+
+    @classmethod
+    def from_history(cls, df, **params):
+        indicator = cls(**params)
+        columns = [col for col in ('high', 'low', 'close') if col in df.columns]
+        for row in zip(*(df[col].to_numpy(dtype=float) for col in columns)):
+            indicator.update(dict(zip(columns, row)))
+        return indicator
+
+    def update(self, bar):
+        raise NotImplementedError
+
+    def to_dict(self):
+        raise NotImplementedError
+
+    @classmethod
+    def from_dict(cls, data):
+        raise NotImplementedError
+
+
+class SMAState(StreamingIndicator):
+    """Simple Moving Average (giống calculate_sma)"""
+
+    name = 'sma'
+
+    def __init__(self, period=20):
+        self.period = period
+        self.window = _RollingWindow(period)
+
+    def update(self, bar):
+        self.window.update(float(bar['close']))
+        return self.value
+
+    @property
+    def value(self):
+        return self.window.mean
+
+    def to_dict(self):
+        return {'name': self.name, 'period': self.period, 'window': self.window.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['period'])
+        state.window = _RollingWindow.from_dict(data['window'])
+        return state
+
+
+class EMAState(StreamingIndicator):
+    """Exponential Moving Average (giống calculate_ema)"""
+
+    name = 'ema'
+
+    def __init__(self, period=20):
+        self.period = period
+        self.ewm = _EWM(2 / (period + 1))
+
+    def update(self, bar):
+        return self.ewm.update(float(bar['close']))
+
+    @property
+    def value(self):
+        return self.ewm.value
+
+    def to_dict(self):
+        return {'name': self.name, 'period': self.period, 'ewm': self.ewm.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['period'])
+        state.ewm = _EWM.from_dict(data['ewm'])
+        return state
+
+
+class RSIState(StreamingIndicator):
+    """RSI với trung bình trượt đơn của gain/loss (giống calculate_rsi)"""
+
+    name = 'rsi'
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = NAN
+        self.gains = _RollingWindow(period)
+        self.losses = _RollingWindow(period)
+
+    def update(self, bar):
+        close = float(bar['close'])
+        delta = close - self.prev_close
+        self.prev_close = close
+        # delta NaN (bar đầu tiên) -> gain = loss = 0, như delta.where(...)
+        self.gains.update(delta if delta > 0 else 0.0)
+        self.losses.update(-delta if delta < 0 else 0.0)
+        return self.value
+
+    @property
+    def value(self):
+        rs = _div(self.gains.mean, self.losses.mean)
+        return 100 - _div(100, 1 + rs)
+
+    def to_dict(self):
+        return {'name': self.name, 'period': self.period, 'prev_close': self.prev_close,
+                'gains': self.gains.to_dict(), 'losses': self.losses.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['period'])
+        state.prev_close = data['prev_close']
+        state.gains = _RollingWindow.from_dict(data['gains'])
+        state.losses = _RollingWindow.from_dict(data['losses'])
+        return state
+
+
+class MACDState(StreamingIndicator):
+    """MACD (giống calculate_macd)"""
+
+    name = 'macd'
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast, self.slow, self.signal = fast, slow, signal
+        self.ema_fast = _EWM(2 / (fast + 1))
+        self.ema_slow = _EWM(2 / (slow + 1))
+        self.ema_signal = _EWM(2 / (signal + 1))
+
+    def update(self, bar):
+        close = float(bar['close'])
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        self.ema_signal.update(macd)
+        return self.value
+
+    @property
+    def value(self):
+        macd = self.ema_fast.value - self.ema_slow.value
+        signal_line = self.ema_signal.value
+        return {'macd': macd, 'signal': signal_line, 'histogram': macd - signal_line}
+
+    def to_dict(self):
+        return {'name': self.name, 'fast': self.fast, 'slow': self.slow, 'signal': self.signal,
+                'ema_fast': self.ema_fast.to_dict(), 'ema_slow': self.ema_slow.to_dict(),
+                'ema_signal': self.ema_signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['fast'], data['slow'], data['signal'])
+        state.ema_fast = _EWM.from_dict(data['ema_fast'])
+        state.ema_slow = _EWM.from_dict(data['ema_slow'])
+        state.ema_signal = _EWM.from_dict(data['ema_signal'])
+        return state
+
+
+class BollingerState(StreamingIndicator):
+    """Bollinger Bands (giống calculate_bollinger_bands)"""
+
+    name = 'bollinger'
+
+    def __init__(self, period=20, std=2):
+        self.period = period
+        self.std = std
+        self.window = _RollingWindow(period)
+
+    def update(self, bar):
+        self.window.update(float(bar['close']))
+        return self.value
+
+    @property
+    def value(self):
+        middle = self.window.mean
+        width = self.window.std * self.std
+        return {'upper': middle + width, 'middle': middle, 'lower': middle - width}
+
+    def to_dict(self):
+        return {'name': self.name, 'period': self.period, 'std': self.std, 'window': self.window.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['period'], data['std'])
+        state.window = _RollingWindow.from_dict(data['window'])
+        return state
+
+
+class StochasticState(StreamingIndicator):
+    """Stochastic Oscillator (giống calculate_stochastic)"""
+
+    name = 'stochastic'
+
+    def __init__(self, k_period=14, d_period=3):
+        self.k_period = k_period
+        self.d_period = d_period
+        self.lows = _RollingExtreme(k_period, is_max=False)
+        self.highs = _RollingExtreme(k_period, is_max=True)
+        self.k_window = _RollingWindow(d_period)
+        self.k = NAN
+
+    def update(self, bar):
+        self.lows.update(float(bar['low']))
+        self.highs.update(float(bar['high']))
+        low_min = self.lows.value
+        self.k = 100 * _div(float(bar['close']) - low_min, self.highs.value - low_min)
+        self.k_window.update(self.k)
+        return self.value
+
+    @property
+    def value(self):
+        return {'k': self.k, 'd': self.k_window.mean}
+
+    def to_dict(self):
+        return {'name': self.name, 'k_period': self.k_period, 'd_period': self.d_period,
+                'lows': self.lows.to_dict(), 'highs': self.highs.to_dict(),
+                'k_window': self.k_window.to_dict(), 'k': self.k}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['k_period'], data['d_period'])
+        state.lows = _RollingExtreme.from_dict(data['lows'])
+        state.highs = _RollingExtreme.from_dict(data['highs'])
+        state.k_window = _RollingWindow.from_dict(data['k_window'])
+        state.k = data['k']
+        return state
+
+
+class ADXState(StreamingIndicator):
+    """Wilder ADX kèm +DI/-DI (giống calculate_adx / calculate_adx_with_di)"""
+
+    name = 'adx'
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_high = self.prev_low = self.prev_close = NAN
+        self.tr_smooth = _EWM(1 / period, period)
+        self.plus_dm_smooth = _EWM(1 / period, period)
+        self.minus_dm_smooth = _EWM(1 / period, period)
+        self.adx_smooth = _EWM(1 / period, period)
+        self.plus_di = self.minus_di = NAN
+
+    def update(self, bar):
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+
+        # True Range (NaN của bar đầu bị bỏ qua như max(axis=1))
+        tr = np.nanmax([high - low, abs(high - self.prev_close), abs(low - self.prev_close)]) \
+            if not math.isnan(self.prev_close) else high - low
+
+        high_diff = high - self.prev_high
+        low_diff = self.prev_low - low
+        plus_dm = high_diff if (high_diff > low_diff and high_diff > 0) else 0.0
+        minus_dm = low_diff if (low_diff > high_diff and low_diff > 0) else 0.0
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+
+        tr_smooth = self.tr_smooth.update(tr)
+        self.plus_di = 100 * _div(self.plus_dm_smooth.update(plus_dm), tr_smooth)
+        self.minus_di = 100 * _div(self.minus_dm_smooth.update(minus_dm), tr_smooth)
+
+        dx = 100 * _div(abs(self.plus_di - self.minus_di), self.plus_di + self.minus_di)
+        self.adx_smooth.update(dx)
+        return self.value
+
+    @property
+    def value(self):
+        return {'adx': self.adx_smooth.value, 'plus_di': self.plus_di, 'minus_di': self.minus_di}
+
+    def to_dict(self):
+        return {'name': self.name, 'period': self.period,
+                'prev': [self.prev_high, self.prev_low, self.prev_close],
+                'tr_smooth': self.tr_smooth.to_dict(), 'plus_dm_smooth': self.plus_dm_smooth.to_dict(),
+                'minus_dm_smooth': self.minus_dm_smooth.to_dict(), 'adx_smooth': self.adx_smooth.to_dict(),
+                'di': [self.plus_di, self.minus_di]}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['period'])
+        state.prev_high, state.prev_low, state.prev_close = data['prev']
+        state.tr_smooth = _EWM.from_dict(data['tr_smooth'])
+        state.plus_dm_smooth = _EWM.from_dict(data['plus_dm_smooth'])
+        state.minus_dm_smooth = _EWM.from_dict(data['minus_dm_smooth'])
+        state.adx_smooth = _EWM.from_dict(data['adx_smooth'])
+        state.plus_di, state.minus_di = data['di']
+        return state
+
+
+STREAMING_INDICATORS = {
+    cls.name: cls for cls in (
+        SMAState, EMAState, RSIState, MACDState, BollingerState, StochasticState, ADXState
+    )
+}
+
+
+def indicator_from_dict(data):
+    """Khôi phục calculator từ dict (output của to_dict)"""
+    return STREAMING_INDICATORS[data['name']].from_dict(data)
+
+
+# Bộ calculator được giữ cạnh parquet store: key -> (class, params)
+STORE_INDICATORS = {
+    'sma20': (SMAState, {'period': 20}),
+    'sma50': (SMAState, {'period': 50}),
+    'ema20': (EMAState, {'period': 20}),
+    'ema50': (EMAState, {'period': 50}),
+    'rsi14': (RSIState, {'period': 14}),
+    'macd': (MACDState, {}),
+    'bollinger': (BollingerState, {}),
+    'stochastic': (StochasticState, {}),
+    'adx14': (ADXState, {'period': 14}),
+}
+
+
+def seed_indicators(df, specs=None):
+    """
+    Seed calculator từ các bar đã đóng của df (mọi bar trừ bar cuối)
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Bar (cột time, high, low, close), sort theo time
+    specs : dict, optional
+        {key: (class, params)}, mặc định STORE_INDICATORS
+
+    Returns:
+    --------
+    tuple : (indicators: {key: StreamingIndicator}, committed_through: pd.Timestamp or None)
+    """
+    specs = specs if specs is not None else STORE_INDICATORS
+    closed = df.iloc[:-1]
+    indicators = {key: cls.from_history(closed, **params) for key, (cls, params) in specs.items()}
+    committed_through = pd.Timestamp(closed['time'].iloc[-1]) if not closed.empty else None
+    return indicators, committed_through
+
+
+def advance_indicators(indicators, df, committed_through):
+    """
+    Đưa các bar mới của df vào calculator, bar cuối là bar đang hình thành
+
+    Bar có time > committed_through, trừ bar cuối, được commit vào state
+    (indicators bị thay đổi). Bar cuối chỉ được tính trên bản sao của state,
+    nên lần gọi sau nó được thay bằng giá mới, hoặc được commit khi đã có
+    bar sau nó.
+
+    Parameters:
+    -----------
+    indicators : dict
+        {key: StreamingIndicator}
+    df : pd.DataFrame
+        Bar (cột time, high, low, close), sort theo time
+    committed_through : pd.Timestamp or None
+        Bar cuối cùng đã commit vào state (None: chưa có bar nào)
+
+    Returns:
+    --------
+    tuple : (values: {key: giá trị tại bar cuối của df}, committed_through mới)
+
+    Raises:
+    -------
+    ValueError : df không còn chứa committed_through (lịch sử đã đổi, cần seed lại)
+    """
+    times = df['time']
+    if committed_through is not None:
+        if not (times == committed_through).any():
+            raise ValueError(f"Bar {committed_through} không còn trong dữ liệu")
+        df = df[times > committed_through]
+
+    if df.empty:
+        return {key: indicator.value for key, indicator in indicators.items()}, committed_through
+
+    bars = df[['high', 'low', 'close']].to_dict('records')
+    for bar in bars[:-1]:
+        for indicator in indicators.values():
+            indicator.update(bar)
+    if len(bars) > 1:
+        committed_through = pd.Timestamp(df['time'].iloc[-2])
+
+    forming = copy.deepcopy(indicators)
+    for indicator in forming.values():
+        indicator.update(bars[-1])
+
+    return {key: indicator.value for key, indicator in forming.items()}, committed_through
@@ -1,22 +1,21 @@
 """
 Module tính toán các chỉ báo kỹ thuật (không cần pandas_ta)
 """
-import pandas as pd
-import numpy as np
 import plotly.graph_objects as go
+from indicators.graph import IndicatorGraph
 
 
-def calculate_sma(df, period):
+def calculate_sma(df, period, graph=None):
     """Tính Simple Moving Average"""
-    return df['close'].rolling(window=period, min_periods=1).mean()
+    return (graph or IndicatorGraph(df)).get('sma', period)
 
 
-def calculate_ema(df, period):
+def calculate_ema(df, period, graph=None):
     """Tính Exponential Moving Average"""
-    return df['close'].ewm(span=period, adjust=False).mean()
+    return (graph or IndicatorGraph(df)).get('ema', period)
 
 
-def calculate_rsi(df, period=14):
+def calculate_rsi(df, period=14, graph=None):
     """
     Tính RSI (Relative Strength Index) thủ công
 
@@ -24,19 +23,10 @@ def calculate_rsi(df, period=14):
     --------
     pd.Series : RSI values
     """
-    close = df['close']
-    delta = close.diff()
+    return (graph or IndicatorGraph(df)).get('rsi', period)
 
-    gain = (delta.where(delta > 0, 0)).rolling(window=period, min_periods=1).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period, min_periods=1).mean()
 
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-
-    return rsi
-
-
-def calculate_macd(df, fast=12, slow=26, signal=9):
+def calculate_macd(df, fast=12, slow=26, signal=9, graph=None):
     """
     Tính MACD (Moving Average Convergence Divergence) thủ công
 
@@ -44,21 +34,16 @@ def calculate_macd(df, fast=12, slow=26, signal=9):
     --------
     dict : {'macd': Series, 'signal': Series, 'histogram': Series}
     """
-    ema_fast = df['close'].ewm(span=fast, adjust=False).mean()
-    ema_slow = df['close'].ewm(span=slow, adjust=False).mean()
-
-    macd = ema_fast - ema_slow
-    signal_line = macd.ewm(span=signal, adjust=False).mean()
-    histogram = macd - signal_line
+    graph = graph or IndicatorGraph(df)
 
     return {
-        'macd': macd,
-        'signal': signal_line,
-        'histogram': histogram
+        'macd': graph.get('macd', fast, slow),
+        'signal': graph.get('macd_signal', fast, slow, signal),
+        'histogram': graph.get('macd_histogram', fast, slow, signal)
     }
 
 
-def calculate_bollinger_bands(df, period=20, std=2):
+def calculate_bollinger_bands(df, period=20, std=2, graph=None):
     """
     Tính Bollinger Bands thủ công
 
@@ -66,20 +51,16 @@ def calculate_bollinger_bands(df, period=20, std=2):
     --------
     dict : {'upper': Series, 'middle': Series, 'lower': Series}
     """
-    sma = df['close'].rolling(window=period, min_periods=1).mean()
-    std_dev = df['close'].rolling(window=period, min_periods=1).std()
-
-    upper_band = sma + (std_dev * std)
-    lower_band = sma - (std_dev * std)
+    graph = graph or IndicatorGraph(df)
 
     return {
-        'upper': upper_band,
-        'middle': sma,
-        'lower': lower_band
+        'upper': graph.get('bb_upper', period, std),
+        'middle': graph.get('sma', period),
+        'lower': graph.get('bb_lower', period, std)
     }
 
 
-def calculate_stochastic(df, k_period=14, d_period=3):
+def calculate_stochastic(df, k_period=14, d_period=3, graph=None):
     """
     Tính Stochastic Oscillator thủ công
 
@@ -87,15 +68,11 @@ def calculate_stochastic(df, k_period=14, d_period=3):
     --------
     dict : {'k': Series, 'd': Series}
     """
-    low_min = df['low'].rolling(window=k_period, min_periods=1).min()
-    high_max = df['high'].rolling(window=k_period, min_periods=1).max()
-
-    k = 100 * (df['close'] - low_min) / (high_max - low_min)
-    d = k.rolling(window=d_period, min_periods=1).mean()
+    graph = graph or IndicatorGraph(df)
 
     return {
-        'k': k,
-        'd': d
+        'k': graph.get('stoch_k', k_period),
+        'd': graph.get('stoch_d', k_period, d_period)
     }
 
 
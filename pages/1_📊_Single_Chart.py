@@ -10,9 +10,11 @@ import pandas as pd
 # Add modules to path
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from data.data_fetcher import get_stock_data, get_available_symbols, format_price, calculate_change
+from data.data_fetcher import (
+    get_stock_data, get_available_symbols, format_price, calculate_change, get_latest_indicators
+)
 from utils.cache_manager import get_cache_stats
-from utils.timeline_helper import calculate_timeline_dates, get_default_timeline_index
+from utils.timeline_helper import calculate_timeline_dates, get_default_timeline_index, get_daily_rangebreaks
 from indicators.technical import (
     add_rsi_subplot, add_macd_subplot, add_bollinger_bands,
     calculate_sma, calculate_ema
@@ -226,6 +228,18 @@ if df is not None and not df.empty:
             value=f"{highest_vol_52w:,.0f}"
         )
 
+    # Chỉ báo khung ngày tại bar mới nhất (streaming indicators, cập nhật theo từng lần refresh)
+    latest_indicators = get_latest_indicators(symbol, '1D')
+    if latest_indicators is not None:
+        values = latest_indicators['values']
+        st.caption(
+            f"Khung ngày {latest_indicators['time']:%d/%m/%Y} | "
+            f"RSI(14): {values['rsi14']:.1f} | "
+            f"MACD hist: {values['macd']['histogram']:.2f} | "
+            f"ADX(14): {values['adx14']['adx']:.1f} "
+            f"(+DI {values['adx14']['plus_di']:.1f} / -DI {values['adx14']['minus_di']:.1f})"
+        )
+
     st.markdown("---")
 
     # Determine number of subplots
@@ -352,19 +366,7 @@ if df is not None and not df.empty:
     axis_config = get_light_axis_config()
 
     # Create rangebreaks to hide non-trading days (only for 1D interval)
-    rangebreaks_list = []
-    if timeframe == '1D':
-        all_dates = pd.to_datetime(df['time']).dt.date.tolist()
-        for i in range(len(all_dates) - 1):
-            current_date = all_dates[i]
-            next_date = all_dates[i + 1]
-            if (next_date - current_date).days > 1:
-                rangebreaks_list.append({
-                    'bounds': [current_date + timedelta(days=1), next_date]
-                })
-        # Limit to 100 rangebreaks
-        if len(rangebreaks_list) > 100:
-            rangebreaks_list = rangebreaks_list[:100]
+    rangebreaks_list = get_daily_rangebreaks(df['time']) if timeframe == '1D' else []
 
     # Turn off vertical grid lines
     x_axis_config = axis_config.copy()
@@ -384,6 +386,8 @@ if df is not None and not df.empty:
 
     # Display chart
     st.plotly_chart(fig, use_container_width=True)
+    if df_full.attrs.get('stale'):
+        st.caption("⏳ Dữ liệu có thể chưa mới nhất - đang cập nhật nền")
 
     # Data table (optional)
     with st.expander("📋 Xem dữ liệu chi tiết"):
@@ -1,14 +1,9 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import requests
 import io
-import time
-from io import StringIO
 import warnings
-from scipy.stats import linregress
 import yfinance as yf
-from vnstock import Vnstock
 import sys
 import os
 import plotly.graph_objects as go
@@ -16,8 +11,17 @@ from plotly.subplots import make_subplots
 
 # Add path to use existing technical indicators module
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from indicators.technical import calculate_sma, calculate_rsi, calculate_macd, calculate_bollinger_bands
-from indicators.adx import calculate_adx
+from indicators.panel import calculate_panel_indicators
+from indicators.breadth import calculate_breadth_components, rolling_trend_score
+from data.client_pool import get_stock_client, http_get
+from data.rate_limiter import acquire_host
+from data.csv_ingest import spool_response, read_ohlcv_csv_file, read_ohlcv_csv, apply_ohlcv_schema
+from data.trend_snapshot import (
+    get_source_entry, get_conditional_headers, update_source_validators,
+    load_source_frame, save_source_frame,
+    load_combined_snapshot, reuse_combined_snapshot, save_combined_snapshot
+)
+from utils.market_calendar import get_cache_epoch
 
 # Suppress specific pandas warnings
 warnings.filterwarnings(
@@ -81,28 +85,89 @@ st.markdown("""
 # =======================================================================================
 # Data Loading & Caching (Multi-source support)
 # =======================================================================================
-@st.cache_data(ttl=3600)
-def load_data_from_gdrive(gdrive_url):
-    """Load single CSV file from Google Drive"""
+# Trong phiên: làm mới mỗi giờ. Ngoài giờ: giữ cache tới phiên kế tiếp.
+# TTL động được thể hiện qua tham số cache_epoch (xem utils/market_calendar.py)
+DATA_INTRADAY_TTL = 3600
+
+# Schema gọn cho các frame được cache: symbol category, chỉ báo float32,
+# Raw Score int8, MACD_Bull / MACD_Crossover bool (xem indicators/panel.py)
+COMPACT_SCHEMA = True
+
+@st.cache_data(ttl=None, max_entries=8)
+def load_data_from_gdrive(gdrive_url, cache_epoch=None):
+    """
+    Load single CSV file from Google Drive
+
+    Gửi conditional GET (If-None-Match / If-Modified-Since) theo validator
+    đã lưu: 304 -> dùng lại frame đã parse trong snapshot cục bộ. Nếu phải
+    tải, body được ghi ra file tạm kèm hash; chỉ parse (theo chunk) khi hash
+    khác lần trước.
+    """
     try:
         file_id = gdrive_url.split('/d/')[1].split('/')[0]
         download_url = f'https://drive.google.com/uc?export=download&id={file_id}'
-        response = requests.get(download_url, timeout=15)
-        response.raise_for_status()
-        df = pd.read_csv(StringIO(response.content.decode('utf-8')))
-        df['date'] = pd.to_datetime(df['date']).dt.normalize()
-        df.columns = [col.lower().strip() for col in df.columns]
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        df.dropna(inplace=True)
+
+        conditional_headers = get_conditional_headers(gdrive_url)
+        response = http_get(download_url, timeout=15, headers=conditional_headers, stream=True)
+        if response.status_code == 304:
+            response.close()
+            df = load_source_frame(gdrive_url)
+            if df is not None:
+                return df
+            # Frame lưu bị lỗi -> tải lại toàn bộ
+            response = http_get(download_url, timeout=15, stream=True)
+
+        # Ghi body ra file tạm + hash trong lúc tải, chưa parse (xem data/csv_ingest.py)
+        with response:
+            response.raise_for_status()
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+            body_path, content_hash = spool_response(response)
+
+        try:
+            # Nội dung giống lần trước: giữ frame + version đã lưu, không parse lại
+            entry = get_source_entry(gdrive_url)
+            if entry is not None and entry.get('content_hash') == content_hash:
+                stored_df = load_source_frame(gdrive_url)
+                if stored_df is not None:
+                    update_source_validators(gdrive_url, **validators)
+                    return stored_df
+
+            # Parse theo chunk, dtype cố định
+            try:
+                df = read_ohlcv_csv_file(body_path)
+            except ValueError as e:
+                print(f"[WARNING] Chunked CSV ingest failed for {file_id}, falling back to full parse: {e}")
+                df = apply_ohlcv_schema(read_ohlcv_csv(body_path))
+        finally:
+            os.remove(body_path)
+
+        # Version của file (ETag / Last-Modified, nếu không có thì hash nội dung) cho fingerprint
+        version = validators['etag'] or validators['last_modified'] or content_hash
+
         df.sort_values(by=['symbol', 'date'], inplace=True)
+        df.attrs['source_version'] = version
+
+        save_source_frame(gdrive_url, df, version, content_hash, **validators)
         return df
     except Exception as e:
         st.error(f"Lỗi khi tải dữ liệu từ Google Drive: {e}")
         return None
 
-@st.cache_data(ttl=3600)
-def load_combined_data_from_multiple_sources():
+def build_dataset_fingerprint(source_versions, df):
+    """
+    Fingerprint rẻ cho dataset: version từng nguồn + số dòng + ngày lớn nhất
+
+    Dùng làm cache key cho các bước tính toán thay vì để st.cache_data
+    hash toàn bộ DataFrame nhiều triệu dòng ở mỗi lần rerun.
+    """
+    versions = '|'.join(f"{source}={version}" for source, version in sorted(source_versions.items()))
+    return f"{versions}#{len(df)}#{df['date'].max():%Y-%m-%d}"
+
+@st.cache_data(ttl=None, max_entries=2)
+def load_combined_data_from_multiple_sources(cache_epoch):
     """Load and combine data from multiple Google Drive files using parallel loading"""
     from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -113,7 +178,13 @@ def load_combined_data_from_multiple_sources():
         "https://drive.google.com/file/d/1op_GzDUtbcXOJOMkI2K-0AU9cF4m8J1S/view?usp=sharing"       # File 3
     ]
 
+    # Snapshot cục bộ đã được ghi / xác nhận trong epoch này: không cần tải lại
+    snapshot_df = load_combined_snapshot(cache_epoch)
+    if snapshot_df is not None:
+        return snapshot_df
+
     all_dataframes = []
+    source_versions = {}
     successful_loads = 0
     load_status = []
 
@@ -122,7 +193,7 @@ def load_combined_data_from_multiple_sources():
         with ThreadPoolExecutor(max_workers=4) as executor:
             # Submit all tasks
             future_to_link = {
-                executor.submit(load_data_from_gdrive, link): (i, link)
+                executor.submit(load_data_from_gdrive, link, cache_epoch): (i, link)
                 for i, link in enumerate(gdrive_links, 1)
             }
 
@@ -133,6 +204,7 @@ def load_combined_data_from_multiple_sources():
                     df = future.result()
                     if df is not None and not df.empty:
                         all_dataframes.append(df)
+                        source_versions[link] = df.attrs.get('source_version')
                         successful_loads += 1
                         load_status.append(f"✅ Nguồn {i}: {len(df)} dòng, {df['symbol'].nunique()} mã CP")
                     else:
@@ -152,8 +224,14 @@ def load_combined_data_from_multiple_sources():
         st.error("❌ Không thể tải dữ liệu từ bất kỳ nguồn nào!")
         return None
 
-    # Combine all dataframes
-    combined_df = pd.concat(all_dataframes, ignore_index=True)
+    # Không nguồn nào thay đổi so với snapshot: dùng lại dataset đã gộp
+    if successful_loads == len(gdrive_links):
+        snapshot_df = reuse_combined_snapshot(source_versions, cache_epoch)
+        if snapshot_df is not None:
+            return snapshot_df
+
+    # Combine all dataframes (giữ schema gọn: symbol category, giá float32)
+    combined_df = apply_ohlcv_schema(pd.concat(all_dataframes, ignore_index=True))
 
     # Remove duplicates (same symbol + date, keep latest)
     duplicates_before = len(combined_df)
@@ -163,18 +241,25 @@ def load_combined_data_from_multiple_sources():
     # Sort by symbol and date
     combined_df = combined_df.sort_values(by=['symbol', 'date']).reset_index(drop=True)
 
+    combined_df.attrs['fingerprint'] = build_dataset_fingerprint(source_versions, combined_df)
+    # Chỉ lưu snapshot khi đủ tất cả nguồn
+    if successful_loads == len(gdrive_links):
+        save_combined_snapshot(combined_df, combined_df.attrs['fingerprint'], source_versions, cache_epoch)
+
     st.info(f"📊 Tổng hợp: {len(combined_df):,} dòng từ {successful_loads}/{len(gdrive_links)} nguồn | "
             f"{combined_df['symbol'].nunique()} mã CP | Đã loại bỏ {duplicates_removed:,} bản ghi trùng")
 
     return combined_df
 
-@st.cache_data(ttl=3600)
-def get_vnindex_data_robust(start_date, end_date):
+YFINANCE_HOST = 'query1.finance.yahoo.com'
+
+@st.cache_data(ttl=None, max_entries=4)
+def get_vnindex_data_robust(start_date, end_date, cache_epoch=None):
     start_date_str = pd.to_datetime(start_date).strftime('%Y-%m-%d')
     end_date_str = pd.to_datetime(end_date).strftime('%Y-%m-%d')
     try:
-        vnstock = Vnstock()
-        vnindex = vnstock.stock(symbol='VNINDEX', source='TCBS').quote.history(start=start_date_str, end=end_date_str)
+        acquire_host('TCBS')
+        vnindex = get_stock_client('VNINDEX', 'TCBS').quote.history(start=start_date_str, end=end_date_str)
         if not vnindex.empty:
             vnindex.rename(columns={'time': 'Date', 'close': 'Close'}, inplace=True)
             vnindex['Date'] = pd.to_datetime(vnindex['Date']).dt.normalize()
@@ -184,184 +269,65 @@ def get_vnindex_data_robust(start_date, end_date):
         pass
     end_date_adj = pd.to_datetime(end_date) + pd.Timedelta(days=1)
     for _ in range(3):
+        # Rate limiter thay cho time.sleep(2) giữa các lần thử
+        acquire_host(YFINANCE_HOST)
         try:
             vnindex_yf = yf.download('^VNINDEX', start=start_date_str, end=end_date_adj, progress=False, timeout=10)
             if not vnindex_yf.empty:
                 vnindex_yf.index = vnindex_yf.index.tz_localize(None).normalize()
                 return vnindex_yf
-            time.sleep(2)
         except Exception:
-            time.sleep(2)
+            pass
     st.warning("Không thể tải dữ liệu VN-Index. Biểu đồ so sánh sẽ không được hiển thị.")
     return None
 
 # =======================================================================================
 # ADVANCED Indicator Calculation with ROBUST scoring
 # =======================================================================================
-@st.cache_data
-def calculate_all_indicators_advanced(df):
-    def apply_features(group):
-        # Base indicators - using manual calculation instead of pandas_ta
-        group['SMA_20'] = calculate_sma(group, 20)
-        group['SMA_50'] = calculate_sma(group, 50)
-        group['SMA_100'] = calculate_sma(group, 100)
-        group['SMA_200'] = calculate_sma(group, 200)
-        group['RSI_14'] = calculate_rsi(group, 14)
-
-        # MACD
-        macd_data = calculate_macd(group, fast=12, slow=26, signal=9)
-        group['MACD_12_26_9'] = macd_data['macd']
-        group['MACDs_12_26_9'] = macd_data['signal']
-        group['MACDh_12_26_9'] = macd_data['histogram']
-
-        # Bollinger Bands
-        bb_data = calculate_bollinger_bands(group, period=20, std=2)
-        group['BBU_20_2.0'] = bb_data['upper']
-        group['BBM_20_2.0'] = bb_data['middle']
-        group['BBL_20_2.0'] = bb_data['lower']
-
-        # Volume SMA
-        group['VOL_SMA_20'] = group['volume'].rolling(window=20, min_periods=1).mean()
-
-        # ADX calculation (real implementation)
-        try:
-            group['ADX_14'] = calculate_adx(group, period=14)
-        except Exception as e:
-            # Fallback to NaN if calculation fails
-            group['ADX_14'] = np.nan
-        
-        raw_score = pd.Series(0, index=group.index)
-
-        # --- BALANCED Scoring Logic (No Bias) ---
-        # Price vs SMA200 (±3 points - long-term trend)
-        if 'SMA_200' in group.columns:
-            raw_score += np.where(group['close'] > group['SMA_200'], 3, -3)
-
-        # Price vs SMA100 (±2 points - medium-term trend)
-        if 'SMA_100' in group.columns:
-            raw_score += np.where(group['close'] > group['SMA_100'], 2, -2)
-
-        # SMA100 vs SMA200 alignment (±2 points - trend direction)
-        if all(c in group.columns for c in ['SMA_100', 'SMA_200']):
-            raw_score += np.where(group['SMA_100'] > group['SMA_200'], 2, -2)
-
-        # Price vs SMA50 (±2 points - short-term trend)
-        if 'SMA_50' in group.columns:
-            raw_score += np.where(group['close'] > group['SMA_50'], 2, -2)
-
-        # Price vs SMA20 (±1 point - immediate trend)
-        if 'SMA_20' in group.columns:
-            raw_score += np.where(group['close'] > group['SMA_20'], 1, -1)
-
-        # SMA20 vs SMA50 alignment (±1 point)
-        if all(c in group.columns for c in ['SMA_20', 'SMA_50']):
-            raw_score += np.where(group['SMA_20'] > group['SMA_50'], 1, -1)
-
-        # RSI (±2 points - momentum)
-        if 'RSI_14' in group.columns:
-            rsi_conditions = [group['RSI_14'] > 70, group['RSI_14'] > 50, group['RSI_14'] < 30, group['RSI_14'] < 50]
-            rsi_scores = [2, 1, -2, -1]
-            raw_score += np.select(rsi_conditions, rsi_scores, default=0)
-
-        # MACD crossover (±2 points - trend change)
-        if all(c in group.columns for c in ['MACD_12_26_9', 'MACDs_12_26_9']):
-            macd_bullish = (group['MACD_12_26_9'] > group['MACDs_12_26_9']) & (group['MACD_12_26_9'].shift(1) <= group['MACDs_12_26_9'].shift(1))
-            macd_bearish = (group['MACD_12_26_9'] < group['MACDs_12_26_9']) & (group['MACD_12_26_9'].shift(1) >= group['MACDs_12_26_9'].shift(1))
-            raw_score += np.where(macd_bullish, 2, 0)
-            raw_score += np.where(macd_bearish, -2, 0)
-
-        # ADX (trend strength - NOT directional, so only penalize weak trends)
-        if 'ADX_14' in group.columns:
-            # ADX > 25 = strong trend (good), < 20 = weak trend (bad)
-            # Don't add/subtract for direction, just measure trend strength
-            adx_valid = ~group['ADX_14'].isna()
-            adx_conditions = [
-                adx_valid & (group['ADX_14'] > 40),  # Very strong trend
-                adx_valid & (group['ADX_14'] > 25),  # Strong trend
-                adx_valid & (group['ADX_14'] < 20)   # Weak/no trend
-            ]
-            adx_scores = [1, 0, -1]  # Neutral for strong trend, penalty for weak
-            raw_score += np.select(adx_conditions, adx_scores, default=0)
-
-        # Volume confirmation (±2 points)
-        if 'VOL_SMA_20' in group.columns:
-            strong_bullish_candle = (group['close'] > group['open']) & (group['volume'] > group['VOL_SMA_20'])
-            strong_bearish_candle = (group['close'] < group['open']) & (group['volume'] > group['VOL_SMA_20'])
-            raw_score += np.where(strong_bullish_candle, 2, 0)
-            raw_score += np.where(strong_bearish_candle, -2, 0)
-
-        # Bollinger Bands (±1 point - overbought/oversold)
-        if all(c in group.columns for c in ['BBU_20_2.0', 'BBL_20_2.0']):
-            raw_score += np.where(group['close'] > group['BBU_20_2.0'], 1, 0)  # Overbought
-            raw_score += np.where(group['close'] < group['BBL_20_2.0'], -1, 0)  # Oversold
-        
-        group['Raw Score'] = raw_score
-        group['Trend Score'] = group['Raw Score'].rolling(window=10).mean()
-        
-        group['prev_close'] = group['close'].shift(1)
-        group['MACD_Bull'] = group['MACD_12_26_9'] > group['MACDs_12_26_9'] if all(c in group.columns for c in ['MACD_12_26_9', 'MACDs_12_26_9']) else False
-        group['MACD_Crossover'] = group['MACD_Bull'].diff()
-        
-        return group
-
-    df_with_indicators = df.groupby('symbol', group_keys=False).apply(apply_features)
+# Các bước tính toán nhận _df (st.cache_data không hash tham số bắt đầu bằng "_")
+# và dùng fingerprint của dataset làm cache key
+@st.cache_data(max_entries=2)
+def calculate_all_indicators_advanced(_df, fingerprint):
+    # Vectorized panel engine: 1 lần tính trên ma trận (bar × mã) thay vì groupby.apply từng mã.
+    # Cùng các cột output và trọng số chấm điểm (xem indicators/panel.py).
+    # calculate_panel_indicators không sửa _df nên không cần .copy()
+    df_with_indicators = calculate_panel_indicators(_df, compact=COMPACT_SCHEMA)
     return df_with_indicators
 
-def generate_latest_day_signals_advanced(df_with_indicators):
-    latest_signals = []
-    latest_date = df_with_indicators['date'].max()
-    latest_df = df_with_indicators[df_with_indicators['date'] == latest_date]
-    for _, latest in latest_df.iterrows():
-        score = latest['Raw Score']
-        if score > 10: trend = "Rất Tích cực"
-        elif score > 5: trend = "Tích cực"
-        elif score < -5: trend = "Rất Tiêu cực"
-        elif score < 0: trend = "Tiêu cực"
-        else: trend = "Trung lập"
-        latest_signals.append({
-            "Mã CP": latest['symbol'], "Giá đóng cửa": f"{latest['close'] / 1000:.2f}",
-            "Điểm Sức khỏe": f"{int(score)}", "Đánh giá": trend,
-            "ADX (14)": f"{latest.get('ADX_14', 0):.1f}", "Volume": "Cao" if pd.notna(latest.get('VOL_SMA_20')) and latest['volume'] > latest.get('VOL_SMA_20', float('inf')) else "Thấp"
-        })
-    return pd.DataFrame(latest_signals)
-
-@st.cache_data
-def calculate_market_breadth_history(df_with_indicators):
-    breadth_data = []
-    # (The rest of this function is identical to the previous version)
-    for date, daily_df in df_with_indicators.groupby('date'):
-        if daily_df.empty: continue
-        total_stocks = len(daily_df)
-        advances = (daily_df['close'] > daily_df['prev_close']).sum()
-        declines = (daily_df['close'] < daily_df['prev_close']).sum()
-        up_volume = daily_df[daily_df['close'] > daily_df['prev_close']]['volume'].sum()
-        down_volume = daily_df[daily_df['close'] < daily_df['prev_close']]['volume'].sum()
-        ad_ratio = advances / declines if declines > 0 else (advances / 1)
-        ud_vol_ratio = up_volume / down_volume if down_volume > 0 else (up_volume / 1)
-        trin = ad_ratio / ud_vol_ratio if ud_vol_ratio > 0 else 0
-        breadth_data.append({
-            'Date': date, 'A-D Net': advances - declines,
-            'Up Vol': up_volume, 'Down Vol': down_volume, 'TRIN': trin,
-            '% > MA50': (daily_df['close'] > daily_df['SMA_50']).sum() / total_stocks if 'SMA_50' in daily_df.columns else 0,
-            '% > MA200': (daily_df['close'] > daily_df['SMA_200']).sum() / total_stocks if 'SMA_200' in daily_df.columns else 0,
-            '% RSI > 50': (daily_df['RSI_14'] > 50).sum() / total_stocks if 'RSI_14' in daily_df.columns else 0,
-            '% MACD Crossover': (daily_df['MACD_Crossover'] == True).sum() / total_stocks if 'MACD_Crossover' in daily_df.columns else 0
-        })
-    breadth_df = pd.DataFrame(breadth_data).set_index('Date').sort_index()
+@st.cache_data(max_entries=2)
+def generate_latest_day_signals_advanced(_df_with_indicators, fingerprint):
+    # Vectorized: np.select cho nhãn xu hướng + format theo cột thay vì iterrows
+    latest_date = _df_with_indicators['date'].max()
+    latest_df = _df_with_indicators[_df_with_indicators['date'] == latest_date]
+
+    score = latest_df['Raw Score'].to_numpy()
+    trend = np.select(
+        [score > 10, score > 5, score < -5, score < 0],
+        ["Rất Tích cực", "Tích cực", "Rất Tiêu cực", "Tiêu cực"],
+        default="Trung lập"
+    )
+    adx = latest_df['ADX_14'] if 'ADX_14' in latest_df.columns else pd.Series(0, index=latest_df.index)
+    # So sánh với NaN luôn False -> "Thấp", giống điều kiện pd.notna(VOL_SMA_20) cũ
+    high_volume = (latest_df['volume'] > latest_df['VOL_SMA_20']).to_numpy() \
+        if 'VOL_SMA_20' in latest_df.columns else np.zeros(len(latest_df), dtype=bool)
+
+    return pd.DataFrame({
+        "Mã CP": latest_df['symbol'].astype(str).to_numpy(),
+        "Giá đóng cửa": (latest_df['close'] / 1000).map('{:.2f}'.format).to_numpy(),
+        "Điểm Sức khỏe": latest_df['Raw Score'].astype(int).astype(str).to_numpy(),
+        "Đánh giá": trend,
+        "ADX (14)": adx.map('{:.1f}'.format).to_numpy(),
+        "Volume": np.where(high_volume, "Cao", "Thấp"),
+    })
+
+@st.cache_data(max_entries=2)
+def calculate_market_breadth_history(_df_with_indicators, fingerprint):
+    # Vectorized: mỗi chỉ số theo ngày là 1 phép bincount (xem indicators/breadth.py)
+    breadth_df = calculate_breadth_components(_df_with_indicators)
     breadth_df['A-D Line'] = breadth_df['A-D Net'].cumsum()
     breadth_df['U/D Ratio'] = breadth_df['Up Vol'] / breadth_df['Down Vol'].replace(0, 1)
     breadth_df['U/D Ratio MA5'] = breadth_df['U/D Ratio'].rolling(window=5).mean()
-    def get_trend_score(series):
-        y = series.dropna()
-        if len(y) < 5: return np.nan
-        x = np.arange(len(y)); slope, _, _, _, _ = linregress(x, y)
-        normalized_slope = slope / y.mean() if y.mean() != 0 else 0
-        if normalized_slope > 0.05: return 2
-        elif normalized_slope > 0.01: return 1
-        elif normalized_slope < -0.05: return -2
-        elif normalized_slope < -0.01: return -1
-        else: return 0
-    breadth_df['Score ADL'] = breadth_df['A-D Line'].rolling(window=10).apply(get_trend_score, raw=False)
+    breadth_df['Score ADL'] = rolling_trend_score(breadth_df['A-D Line'], window=10)
 
     # Scoring theo đúng logic từ hình (Tính tổng điểm)
     score_columns_to_create = {
@@ -468,17 +434,19 @@ def main():
         pass
 
     # Load combined data from all 4 sources
-    master_df = load_combined_data_from_multiple_sources()
+    cache_epoch = get_cache_epoch(DATA_INTRADAY_TTL)
+    master_df = load_combined_data_from_multiple_sources(cache_epoch)
     if master_df is not None:
+        fingerprint = master_df.attrs.get('fingerprint') or str(pd.util.hash_pandas_object(master_df).sum())
         with st.spinner('Đang tính toán toàn bộ chỉ báo và điểm sức khỏe nâng cao...'):
-            df_with_indicators = calculate_all_indicators_advanced(master_df.copy())
+            df_with_indicators = calculate_all_indicators_advanced(master_df, fingerprint)
 
         # ===== BỀ RỘNG THỊ TRƯỜNG - ĐẦU TRANG =====
         st.header("📈 Lịch sử Bề rộng Thị trường")
-        breadth_history_df = calculate_market_breadth_history(df_with_indicators)
+        breadth_history_df = calculate_market_breadth_history(df_with_indicators, fingerprint)
         breadth_start_date = breadth_history_df.index.min()
         breadth_end_date = breadth_history_df.index.max()
-        vnindex_df = get_vnindex_data_robust(breadth_start_date, breadth_end_date)
+        vnindex_df = get_vnindex_data_robust(breadth_start_date, breadth_end_date, cache_epoch)
 
         for col in ['% > MA50', '% > MA200', '% RSI > 50', '% MACD Crossover']:
              breadth_history_df[col] = breadth_history_df[col].apply(lambda x: f"{x*100:.1f}%" if pd.notna(x) else "N/A")
@@ -629,7 +597,7 @@ def main():
 
         # ===== PHÂN TÍCH CHI TIẾT NGÀY GẦN NHẤT =====
         st.header(f"📊 Phân tích Chi tiết Ngày Gần Nhất ({df_with_indicators['date'].max().strftime('%Y-%m-%d')})")
-        latest_signals_df = generate_latest_day_signals_advanced(df_with_indicators)
+        latest_signals_df = generate_latest_day_signals_advanced(df_with_indicators, fingerprint)
         trend_counts = latest_signals_df['Đánh giá'].value_counts()
         pos_count = trend_counts.get("Rất Tích cực", 0) + trend_counts.get("Tích cực", 0)
         neg_count = trend_counts.get("Rất Tiêu cực", 0) + trend_counts.get("Tiêu cực", 0)
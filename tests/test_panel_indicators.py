@@ -0,0 +1,168 @@
+"""
+So sánh panel / breadth engine với cách tính cũ trên universe lệch
+(mã niêm yết sau, số phiên khác nhau, thiếu phiên):
+- calculate_panel_indicators vs groupby('symbol').apply(apply_features)
+- calculate_breadth_components vs vòng lặp groupby('date')
+- rolling_trend_score vs rolling(10).apply(linregress)
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.stats import linregress
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from indicators.technical import calculate_sma, calculate_rsi, calculate_macd, calculate_bollinger_bands
+from indicators.adx import calculate_adx
+from indicators.panel import calculate_panel_indicators
+from indicators.breadth import calculate_breadth_components, rolling_trend_score
+
+
+def _ragged_universe(n_symbols=12, seed=7):
+    rng = np.random.default_rng(seed)
+    calendar = pd.bdate_range('2023-01-02', periods=320)
+    frames = []
+    for i in range(n_symbols):
+        # Niêm yết sau / dừng sớm, và bỏ ngẫu nhiên vài phiên (tạm ngừng GD)
+        start = int(rng.integers(0, 150))
+        length = int(rng.integers(3, 320 - start + 1))
+        dates = calendar[start:start + length]
+        dates = dates[rng.random(len(dates)) > 0.05]
+        close = np.cumprod(1 + rng.normal(0, 0.02, len(dates))) * 20000
+        frames.append(pd.DataFrame({
+            'symbol': f'S{i:02d}',
+            'date': dates,
+            'open': close * (1 + rng.normal(0, 0.005, len(dates))),
+            'high': close * 1.02,
+            'low': close * 0.98,
+            'close': close,
+            'volume': rng.integers(1_000, 100_000, len(dates)).astype(float),
+        }))
+    return pd.concat(frames, ignore_index=True).sort_values(['symbol', 'date']).reset_index(drop=True)
+
+
+def _apply_features(group):
+    # Cách tính cũ của pages/2_Trend_Index.py (từng mã)
+    group = group.copy()
+    for period in (20, 50, 100, 200):
+        group[f'SMA_{period}'] = calculate_sma(group, period)
+    group['RSI_14'] = calculate_rsi(group, 14)
+
+    macd_data = calculate_macd(group, fast=12, slow=26, signal=9)
+    group['MACD_12_26_9'] = macd_data['macd']
+    group['MACDs_12_26_9'] = macd_data['signal']
+    group['MACDh_12_26_9'] = macd_data['histogram']
+
+    bb_data = calculate_bollinger_bands(group, period=20, std=2)
+    group['BBU_20_2.0'] = bb_data['upper']
+    group['BBM_20_2.0'] = bb_data['middle']
+    group['BBL_20_2.0'] = bb_data['lower']
+
+    group['VOL_SMA_20'] = group['volume'].rolling(window=20, min_periods=1).mean()
+    group['ADX_14'] = calculate_adx(group, period=14)
+
+    close, macd, signal = group['close'], group['MACD_12_26_9'], group['MACDs_12_26_9']
+    raw_score = pd.Series(0, index=group.index)
+    raw_score += np.where(close > group['SMA_200'], 3, -3)
+    raw_score += np.where(close > group['SMA_100'], 2, -2)
+    raw_score += np.where(group['SMA_100'] > group['SMA_200'], 2, -2)
+    raw_score += np.where(close > group['SMA_50'], 2, -2)
+    raw_score += np.where(close > group['SMA_20'], 1, -1)
+    raw_score += np.where(group['SMA_20'] > group['SMA_50'], 1, -1)
+    rsi = group['RSI_14']
+    raw_score += np.select([rsi > 70, rsi > 50, rsi < 30, rsi < 50], [2, 1, -2, -1], default=0)
+    raw_score += np.where((macd > signal) & (macd.shift(1) <= signal.shift(1)), 2, 0)
+    raw_score += np.where((macd < signal) & (macd.shift(1) >= signal.shift(1)), -2, 0)
+    adx = group['ADX_14']
+    adx_valid = ~adx.isna()
+    raw_score += np.select([adx_valid & (adx > 40), adx_valid & (adx > 25), adx_valid & (adx < 20)],
+                           [1, 0, -1], default=0)
+    high_volume = group['volume'] > group['VOL_SMA_20']
+    raw_score += np.where((close > group['open']) & high_volume, 2, 0)
+    raw_score += np.where((close < group['open']) & high_volume, -2, 0)
+    raw_score += np.where(close > group['BBU_20_2.0'], 1, 0)
+    raw_score += np.where(close < group['BBL_20_2.0'], -1, 0)
+
+    group['Raw Score'] = raw_score
+    group['Trend Score'] = group['Raw Score'].rolling(window=10).mean()
+    group['prev_close'] = close.shift(1)
+    group['MACD_Bull'] = macd > signal
+    group['MACD_Crossover'] = group['MACD_Bull'].diff()
+    return group
+
+
+def _breadth_by_date(df):
+    # Cách tính cũ của calculate_market_breadth_history (từng ngày)
+    rows = []
+    for date, daily_df in df.groupby('date'):
+        total_stocks = len(daily_df)
+        up = daily_df['close'] > daily_df['prev_close']
+        down = daily_df['close'] < daily_df['prev_close']
+        advances, declines = up.sum(), down.sum()
+        up_volume = daily_df.loc[up, 'volume'].sum()
+        down_volume = daily_df.loc[down, 'volume'].sum()
+        ad_ratio = advances / declines if declines > 0 else advances
+        ud_vol_ratio = up_volume / down_volume if down_volume > 0 else up_volume
+        rows.append({
+            'Date': date,
+            'A-D Net': advances - declines,
+            'Up Vol': up_volume,
+            'Down Vol': down_volume,
+            'TRIN': ad_ratio / ud_vol_ratio if ud_vol_ratio > 0 else 0,
+            '% > MA50': (daily_df['close'] > daily_df['SMA_50']).sum() / total_stocks,
+            '% > MA200': (daily_df['close'] > daily_df['SMA_200']).sum() / total_stocks,
+            '% RSI > 50': (daily_df['RSI_14'] > 50).sum() / total_stocks,
+            '% MACD Crossover': (daily_df['MACD_Crossover'] == True).sum() / total_stocks,  # noqa: E712
+        })
+    return pd.DataFrame(rows).set_index('Date').sort_index()
+
+
+def _linregress_score(series):
+    y = series.dropna()
+    if len(y) < 5:
+        return np.nan
+    slope = linregress(np.arange(len(y)), y).slope
+    normalized_slope = slope / y.mean() if y.mean() != 0 else 0
+    if normalized_slope > 0.05:
+        return 2
+    elif normalized_slope > 0.01:
+        return 1
+    elif normalized_slope < -0.05:
+        return -2
+    elif normalized_slope < -0.01:
+        return -1
+    return 0
+
+
+def test_panel_breadth_and_trend_score_match_per_symbol_reference():
+    df = _ragged_universe()
+    assert df.groupby('symbol').size().nunique() > 1
+
+    expected = pd.concat([_apply_features(group) for _, group in df.groupby('symbol', sort=False)])
+    result = calculate_panel_indicators(df)
+
+    assert list(result.columns) == list(expected.columns)
+    for column in expected.columns:
+        if column in ('symbol', 'date'):
+            assert result[column].equals(expected[column]), column
+        elif column == 'MACD_Crossover':
+            # Bar đầu mỗi mã: diff() của bool là NaN/None -> chỉ so phần còn lại
+            valid = expected[column].notna()
+            assert result[column].isna().equals(~valid), column
+            assert (result.loc[valid, column].astype(bool) == expected.loc[valid, column].astype(bool)).all(), column
+        else:
+            np.testing.assert_allclose(result[column].astype(float), expected[column].astype(float),
+                                       rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=column)
+
+    breadth = calculate_breadth_components(result)
+    expected_breadth = _breadth_by_date(expected)
+    assert breadth.index.equals(expected_breadth.index)
+    for column in expected_breadth.columns:
+        np.testing.assert_allclose(breadth[column].astype(float), expected_breadth[column].astype(float),
+                                   rtol=1e-12, err_msg=column)
+
+    ad_line = breadth['A-D Net'].cumsum()
+    expected_score = ad_line.rolling(window=10).apply(_linregress_score, raw=False)
+    np.testing.assert_array_equal(rolling_trend_score(ad_line, window=10).to_numpy(), expected_score.to_numpy())
@@ -1,9 +1,22 @@
 """
-Cache Manager - Optimized caching strategy with pre-calculated indicators
+Cache Manager - Optimized caching strategy with lazily calculated indicators
 """
 import streamlit as st
 from datetime import datetime, timedelta
 import pandas as pd
+from utils.sized_cache import SizedLRUCache
+
+# Entry trong session cache hợp lệ trong 5 phút
+CACHE_TTL_SECONDS = 300
+
+# Ngân sách dung lượng cho cache của mỗi session
+SESSION_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Cache dùng chung cho mọi session trong process: mỗi (mã, khoảng ngày, khung)
+# chỉ lưu 1 bản data + indicators, các session chỉ giữ tham chiếu
+SHARED_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+_shared_cache = SizedLRUCache(SHARED_CACHE_MAX_BYTES, ttl=CACHE_TTL_SECONDS)
 
 
 def get_cache_key(symbol, start_date, end_date, resolution):
@@ -28,122 +41,157 @@ def get_cache_key(symbol, start_date, end_date, resolution):
     return f"{CACHE_VERSION}_{symbol}_{start_date}_{end_date}_{resolution}"
 
 
-def calculate_common_indicators(df):
+# Các indicator hay dùng (calculate_common_indicators tính sẵn khi cần dict đầy đủ)
+COMMON_INDICATORS = (
+    [f'sma{period}' for period in [5, 10, 20, 50, 100, 200]]
+    + [f'ema{period}' for period in [5, 10, 20, 50, 100, 200]]
+    + ['rsi14', 'macd', 'macd_signal', 'macd_histogram', 'bb_upper', 'bb_middle', 'bb_lower']
+)
+
+
+def get_lazy_indicators(df):
     """
-    Pre-calculate common indicators to cache with raw data
+    Container indicator tính lazy cho df (xem indicators/lazy.py)
 
     Returns:
     --------
-    dict : Dictionary of pre-calculated indicators
+    LazyIndicators or dict : dict rỗng nếu không có data
     """
-    from indicators.technical import (
-        calculate_sma, calculate_ema, calculate_rsi,
-        calculate_macd, calculate_bollinger_bands
-    )
+    from indicators.lazy import LazyIndicators
 
     if df is None or df.empty:
         return {}
 
-    indicators = {}
-
-    # Moving Averages (most common periods)
-    for period in [5, 10, 20, 50, 100, 200]:
-        try:
-            indicators[f'sma{period}'] = calculate_sma(df, period)
-            indicators[f'ema{period}'] = calculate_ema(df, period)
-        except:
-            pass
-
-    # RSI
-    try:
-        indicators['rsi14'] = calculate_rsi(df, 14)
-    except:
-        pass
-
-    # MACD
-    try:
-        macd_data = calculate_macd(df)
-        indicators['macd'] = macd_data['macd']
-        indicators['macd_signal'] = macd_data['signal']
-        indicators['macd_histogram'] = macd_data['histogram']
-    except:
-        pass
-
-    # Bollinger Bands
-    try:
-        bb_data = calculate_bollinger_bands(df, 20, 2)
-        indicators['bb_upper'] = bb_data['upper']
-        indicators['bb_middle'] = bb_data['middle']
-        indicators['bb_lower'] = bb_data['lower']
-    except:
-        pass
+    return LazyIndicators(df)
 
-    return indicators
+
+def calculate_common_indicators(df):
+    """
+    Tính ngay các indicator trong COMMON_INDICATORS
+
+    Returns:
+    --------
+    dict : Dictionary of pre-calculated indicators
+    """
+    indicators = get_lazy_indicators(df)
+    return {name: indicators[name] for name in COMMON_INDICATORS if indicators.get(name) is not None}
+
+
+def _get_session_cache():
+    """SizedLRUCache của session hiện tại (tạo mới nếu chưa có)"""
+    cache = st.session_state.get('stock_data_cache')
+    if not isinstance(cache, SizedLRUCache):
+        cache = SizedLRUCache(SESSION_CACHE_MAX_BYTES, ttl=CACHE_TTL_SECONDS)
+        st.session_state['stock_data_cache'] = cache
+    return cache
+
+
+def _checkout(cache_data):
+    # DataFrame dùng chung được trả qua checkout_copy (shallow nếu có Copy-on-Write,
+    # deep nếu không) nên caller sửa data không ảnh hưởng session khác;
+    # LazyIndicators tự copy Series khi trả về và thread-safe
+    from indicators.lazy import checkout_copy
+
+    return checkout_copy(cache_data.get('data')), cache_data.get('indicators', {})
 
 
 def get_cached_data(symbol, start_date, end_date, resolution):
     """
-    Lấy data từ session_state cache (bao gồm cả indicators)
+    Lấy data từ cache (session trước, sau đó cache dùng chung của process)
 
     Returns:
     --------
     tuple: (DataFrame, dict of indicators) hoặc (None, None) nếu không có cache
     """
     cache_key = get_cache_key(symbol, start_date, end_date, resolution)
+    session_cache = _get_session_cache()
+    cache_data = session_cache.get(cache_key)
 
-    if 'stock_data_cache' not in st.session_state:
-        st.session_state['stock_data_cache'] = {}
-
-    cache_data = st.session_state['stock_data_cache'].get(cache_key)
+    if cache_data is None:
+        cache_data = _shared_cache.get(cache_key)
+        if cache_data is not None:
+            session_cache.set(cache_key, cache_data)
 
     if cache_data:
-        # Check if cache is still valid (5 minutes = 300 seconds)
-        cache_time = cache_data.get('timestamp')
-        if cache_time and (datetime.now() - cache_time).total_seconds() < 300:
-            return cache_data.get('data'), cache_data.get('indicators', {})
+        return _checkout(cache_data)
 
     return None, None
 
 
 def set_cached_data(symbol, start_date, end_date, resolution, data):
     """
-    Lưu data + pre-calculated indicators vào session_state cache
+    Lưu data + indicators (lazy, chỉ tính khi được truy cập) vào cache
+
+    Entry được lưu 1 lần trong cache dùng chung và được session hiện tại
+    tham chiếu tới. Entry hết hạn sau CACHE_TTL_SECONDS; khi vượt ngân sách
+    dung lượng thì entry ít dùng nhất bị bỏ.
     """
     cache_key = get_cache_key(symbol, start_date, end_date, resolution)
-
-    if 'stock_data_cache' not in st.session_state:
-        st.session_state['stock_data_cache'] = {}
-
-    # Pre-calculate common indicators
-    indicators = calculate_common_indicators(data)
-
-    st.session_state['stock_data_cache'][cache_key] = {
+    cache_data = {
         'data': data,
-        'indicators': indicators,
+        'indicators': get_lazy_indicators(data),
         'timestamp': datetime.now()
     }
 
+    _shared_cache.set(cache_key, cache_data)
+    _get_session_cache().set(cache_key, cache_data)
+
+
+def get_shared_indicators(symbol, start_date, end_date, resolution, df):
+    """
+    Lấy LazyIndicators dùng chung giữa các session cho df
+
+    Indicator đã được session khác tính cho cùng data sẽ được dùng lại;
+    nếu data đã đổi (fingerprint khác) thì tạo entry mới.
+
+    Returns:
+    --------
+    LazyIndicators or dict : dict rỗng nếu không có data
+    """
+    from indicators.lazy import get_frame_fingerprint
+
+    if df is None or df.empty:
+        return {}
+
+    cache_key = get_cache_key(symbol, start_date, end_date, resolution)
+    cache_data = _shared_cache.get(cache_key)
+    if cache_data is not None:
+        indicators = cache_data.get('indicators')
+        if getattr(indicators, 'fingerprint', None) == get_frame_fingerprint(df):
+            return indicators
+
+    # Chỉ ghi vào cache dùng chung (có thể được gọi ngoài script thread của session)
+    indicators = get_lazy_indicators(df)
+    _shared_cache.set(cache_key, {'data': df, 'indicators': indicators, 'timestamp': datetime.now()})
+    return indicators
+
 
 def clear_cache():
-    """Xóa toàn bộ cache"""
+    """Xóa toàn bộ cache của session hiện tại"""
     if 'stock_data_cache' in st.session_state:
-        st.session_state['stock_data_cache'] = {}
+        _get_session_cache().clear()
 
 
-def get_cache_stats():
-    """Lấy thống kê cache"""
-    if 'stock_data_cache' not in st.session_state:
-        return {'total': 0, 'valid': 0}
+def clear_shared_cache():
+    """Xóa cache dùng chung của process"""
+    _shared_cache.clear()
 
-    total = len(st.session_state['stock_data_cache'])
-    valid = 0
 
-    for key, cache_data in st.session_state['stock_data_cache'].items():
-        cache_time = cache_data.get('timestamp')
-        if cache_time and (datetime.now() - cache_time).total_seconds() < 300:
-            valid += 1
+def get_cache_stats():
+    """
+    Lấy thống kê cache
+
+    Returns:
+    --------
+    dict : total, valid, size_mb, max_mb, hits, misses, evictions, expirations
+        của session + 'shared' (thống kê cache dùng chung)
+    """
+    if 'stock_data_cache' not in st.session_state:
+        return {'total': 0, 'valid': 0, 'shared': _shared_cache.get_stats()}
 
-    return {'total': total, 'valid': valid}
+    stats = _get_session_cache().get_stats()
+    stats['shared'] = _shared_cache.get_stats()
+    return stats
 
 
 def get_indicator_from_cache(symbol, start_date, end_date, resolution, indicator_name):
@@ -161,7 +209,7 @@ def get_indicator_from_cache(symbol, start_date, end_date, resolution, indicator
     """
     _, indicators = get_cached_data(symbol, start_date, end_date, resolution)
 
-    if indicators:
+    if indicators is not None:
         return indicators.get(indicator_name)
 
     return None
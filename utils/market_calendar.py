@@ -0,0 +1,203 @@
+"""
+Market Calendar - Lịch phiên giao dịch HOSE để tính cache TTL động
+
+- Trong phiên (và một khoảng sau đóng cửa để chờ data cuối ngày): TTL ngắn
+- Ngoài giờ, nghỉ trưa, cuối tuần, ngày lễ: cache tới phiên mở cửa kế tiếp
+
+Ngày lễ: dương lịch cố định (kèm nghỉ bù khi rơi vào cuối tuần), ngày nghỉ
+âm lịch / nghỉ bù theo lịch HOSE (MARKET_HOLIDAYS), và ngày nghỉ chưa có
+trong lịch được phát hiện từ data (record_session_evidence).
+"""
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+
+# Giờ Việt Nam (không có DST nên dùng offset cố định, không cần tzdata)
+VN_TZ = timezone(timedelta(hours=7))
+
+# Phiên sáng / chiều (ATO 9:00, ATC + thỏa thuận kết thúc 15:00)
+MORNING_SESSION = (time(9, 0), time(11, 30))
+AFTERNOON_SESSION = (time(13, 0), time(15, 0))
+
+# Sau đóng cửa vẫn làm mới theo TTL ngắn tới giờ này (chờ nguồn cập nhật data cuối ngày)
+POST_CLOSE_REFRESH_UNTIL = time(17, 0)
+
+# Ngày lễ dương lịch cố định (tháng, ngày); rơi vào thứ Bảy / Chủ nhật thì được
+# nghỉ bù vào ngày làm việc kế tiếp (Bộ luật Lao động 2019, Điều 112)
+FIXED_HOLIDAYS = {(1, 1), (4, 30), (5, 1), (9, 2)}
+
+# Ngày nghỉ âm lịch (Tết, Giỗ Tổ 10/3) và nghỉ bù của chúng, thay đổi theo năm.
+# Ngày nghỉ liền kề Quốc khánh và ngày hoán đổi do Chính phủ quyết định hằng năm
+# -> chưa có ở đây thì được phát hiện từ data (record_session_evidence)
+MARKET_HOLIDAYS = {
+    # 2026: Tết Bính Ngọ (mùng 1 = 17/02)
+    date(2026, 2, 16), date(2026, 2, 17), date(2026, 2, 18), date(2026, 2, 19), date(2026, 2, 20),
+    # 2026: Giỗ Tổ 26/04 (Chủ nhật) -> nghỉ bù thứ Hai
+    date(2026, 4, 27),
+    # 2027: Tết Đinh Mùi (mùng 1 = 06/02, thứ Bảy). Các ngày chắc chắn nghỉ dù
+    # chọn nghỉ 1 hay 2 ngày trước Tết (kèm nghỉ bù cho thứ Bảy, Chủ nhật)
+    date(2027, 2, 5), date(2027, 2, 8), date(2027, 2, 9), date(2027, 2, 10),
+    # 2027: Giỗ Tổ 16/04 (thứ Sáu)
+    date(2027, 4, 16),
+}
+
+# Phát hiện ngày không có phiên: sau giờ này mà nhiều mã tải xong vẫn không
+# có bar ngày hôm nay (và chưa mã nào có) -> coi hôm nay là ngày nghỉ
+SESSION_EVIDENCE_AFTER = time(9, 15)
+CLOSED_SESSION_EVIDENCE = 5
+
+_session_evidence = {}  # ngày -> số mã không có bar hôm nay; -1: đã thấy bar (có phiên)
+_evidence_lock = threading.Lock()
+
+
+def now_vn():
+    """Thời điểm hiện tại theo giờ Việt Nam"""
+    return datetime.now(VN_TZ)
+
+
+def _to_vn(moment):
+    if moment is None:
+        return now_vn()
+    # datetime naive được hiểu là giờ local của server
+    return moment.astimezone(VN_TZ)
+
+
+def _is_fixed_date(day):
+    return (day.month, day.day) in FIXED_HOLIDAYS
+
+
+def _is_substitute_day(day):
+    """Ngày nghỉ bù cho ngày lễ cố định rơi vào thứ Bảy / Chủ nhật ngay trước tuần của `day`"""
+    monday = day - timedelta(days=day.weekday())
+    owed = sum(1 for offset in (1, 2) if _is_fixed_date(monday - timedelta(days=offset)))
+
+    current = monday
+    while owed and current.weekday() < 5:
+        if not _is_fixed_date(current):
+            if current == day:
+                return True
+            owed -= 1
+        current += timedelta(days=1)
+    return False
+
+
+def _is_scheduled_trading_day(day):
+    if day.weekday() >= 5:
+        return False
+    return not (_is_fixed_date(day) or _is_substitute_day(day) or day in MARKET_HOLIDAYS)
+
+
+def is_trading_day(day):
+    """Ngày có giao dịch hay không (bỏ cuối tuần, ngày lễ và ngày nghỉ phát hiện từ data)"""
+    if isinstance(day, datetime):
+        day = day.date()
+    if not _is_scheduled_trading_day(day):
+        return False
+    with _evidence_lock:
+        return _session_evidence.get(day, 0) < CLOSED_SESSION_EVIDENCE
+
+
+def record_session_evidence(has_today_bar, moment=None):
+    """
+    Ghi nhận kết quả tải bar ngày (1D) của 1 mã, khoảng tải có chứa hôm nay
+
+    Ngày nghỉ không có trong lịch (VD: nghỉ liền kề Quốc khánh) được nhận ra
+    khi CLOSED_SESSION_EVIDENCE mã không có bar hôm nay sau SESSION_EVIDENCE_AFTER;
+    chỉ cần 1 mã có bar là hôm nay được xác nhận có phiên.
+
+    Parameters:
+    -----------
+    has_today_bar : bool
+        Nguồn trả về bar của ngày hôm nay
+    moment : datetime, optional
+        Thời điểm tải (mặc định: bây giờ)
+    """
+    moment = _to_vn(moment)
+    day = moment.date()
+    if moment.time() < SESSION_EVIDENCE_AFTER or not _is_scheduled_trading_day(day):
+        return
+
+    with _evidence_lock:
+        count = _session_evidence.get(day, 0)
+        # Chỉ giữ bằng chứng của ngày hiện tại
+        _session_evidence.clear()
+        if has_today_bar or count < 0:
+            _session_evidence[day] = -1
+        else:
+            _session_evidence[day] = count + 1
+
+
+def _at(day, clock):
+    return datetime.combine(day, clock, tzinfo=VN_TZ)
+
+
+def is_market_open(moment=None):
+    """Đang trong phiên giao dịch (kể cả khoảng chờ data cuối ngày)"""
+    moment = _to_vn(moment)
+    if not is_trading_day(moment):
+        return False
+
+    clock = moment.time()
+    in_morning = MORNING_SESSION[0] <= clock < MORNING_SESSION[1]
+    in_afternoon = AFTERNOON_SESSION[0] <= clock < POST_CLOSE_REFRESH_UNTIL
+    return in_morning or in_afternoon
+
+
+def next_session_open(moment=None):
+    """
+    Thời điểm mở phiên kế tiếp (sau `moment`)
+
+    Returns:
+    --------
+    datetime : timezone-aware (VN_TZ)
+    """
+    moment = _to_vn(moment)
+    day = moment.date()
+
+    if is_trading_day(day):
+        for session_start, _ in (MORNING_SESSION, AFTERNOON_SESSION):
+            if moment < _at(day, session_start):
+                return _at(day, session_start)
+
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return _at(day, MORNING_SESSION[0])
+
+
+def get_dynamic_ttl(intraday_ttl, moment=None):
+    """
+    TTL (giây) cho data được lấy tại `moment`
+
+    Parameters:
+    -----------
+    intraday_ttl : int
+        TTL trong phiên (VD: 300 cho chart, 3600 cho file Trend Index)
+    moment : datetime, optional
+        Thời điểm lấy data (mặc định: bây giờ)
+
+    Returns:
+    --------
+    int : intraday_ttl nếu đang trong phiên, ngược lại số giây tới phiên kế tiếp
+    """
+    moment = _to_vn(moment)
+    if is_market_open(moment):
+        return intraday_ttl
+    return max(intraday_ttl, int((next_session_open(moment) - moment).total_seconds()))
+
+
+def get_cache_epoch(intraday_ttl, moment=None):
+    """
+    Giá trị đổi khi cache cần hết hạn - truyền làm tham số cho hàm @st.cache_data
+
+    st.cache_data chỉ nhận TTL cố định nên TTL động được thể hiện qua cache key:
+    trong phiên epoch đổi mỗi intraday_ttl giây, ngoài giờ giữ nguyên
+    tới phiên mở cửa kế tiếp.
+
+    Returns:
+    --------
+    str
+    """
+    moment = _to_vn(moment)
+    if is_market_open(moment):
+        return f"open-{int(moment.timestamp() // intraday_ttl)}"
+    return f"closed-{next_session_open(moment).strftime('%Y-%m-%d %H:%M')}"
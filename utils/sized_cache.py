@@ -0,0 +1,142 @@
+"""
+Sized LRU cache - LRU giới hạn theo dung lượng (byte) + TTL
+
+Dùng cho cache DataFrame / Series / LazyIndicators: entry hết hạn bị xóa,
+khi tổng dung lượng vượt ngân sách thì bỏ entry ít dùng nhất.
+"""
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+import pandas as pd
+
+
+def estimate_size(value):
+    """
+    Ước lượng dung lượng (byte) của value
+
+    DataFrame/Series tính theo buffer numpy (không deep, đủ nhanh để gọi
+    mỗi lần ghi). LazyIndicators dùng memory_usage() của nó; dict/list/Mapping
+    được cộng dồn theo các phần tử hiện có.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage())
+    if isinstance(value, Mapping):
+        return sum(estimate_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value)
+    return 0
+
+
+class SizedLRUCache:
+    """
+    LRU cache thread-safe với ngân sách byte và TTL
+
+    Dung lượng được đo lại khi ghi (entry có thể lớn dần, VD: LazyIndicators
+    tính thêm indicator sau khi được cache).
+
+    Parameters:
+    -----------
+    max_bytes : int
+        Ngân sách dung lượng
+    ttl : float or None
+        Số giây entry còn hợp lệ (None: không hết hạn)
+    """
+
+    def __init__(self, max_bytes, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _is_expired(self, stored_at, now):
+        return self.ttl is not None and now - stored_at >= self.ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry[1], time.monotonic()):
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            self.purge_expired()
+            self._evict_over_budget()
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry is not None else default
+
+    def purge_expired(self):
+        """Xóa các entry đã hết TTL"""
+        with self._lock:
+            now = time.monotonic()
+            expired = [key for key, (_, stored_at) in self._entries.items() if self._is_expired(stored_at, now)]
+            for key in expired:
+                del self._entries[key]
+            self.expirations += len(expired)
+            return len(expired)
+
+    def _evict_over_budget(self):
+        sizes = {key: estimate_size(value) for key, (value, _) in self._entries.items()}
+        total = sum(sizes.values())
+        # Luôn giữ entry mới nhất, kể cả khi riêng nó đã vượt ngân sách
+        while total > self.max_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            total -= sizes[key]
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_expired(entry[1], time.monotonic())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self):
+        """
+        Returns:
+        --------
+        dict : total, valid, size_mb, max_mb, hits, misses, evictions, expirations
+        """
+        with self._lock:
+            now = time.monotonic()
+            valid = sum(1 for _, stored_at in self._entries.values() if not self._is_expired(stored_at, now))
+            size = sum(estimate_size(value) for value, _ in self._entries.values())
+            return {
+                'total': len(self._entries),
+                'valid': valid,
+                'size_mb': round(size / (1024 * 1024), 2),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
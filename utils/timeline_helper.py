@@ -2,6 +2,9 @@
 Timeline Helper - Shared logic for timeline calculation across pages
 """
 from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
+import pandas as pd
 
 
 def calculate_timeline_dates(timeline_option, interval='1D'):
@@ -105,3 +108,53 @@ def get_expected_candles_info(interval, timeline_option):
     }
 
     return expected_candles.get(interval, {}).get(timeline_option, '')
+
+
+@lru_cache(maxsize=64)
+def _find_missing_days(day_bytes):
+    days = np.frombuffer(day_bytes, dtype='datetime64[D]')
+    if len(days) < 2:
+        return False, ()
+
+    # 1 lần np.diff: khoảng cách > 1 ngày là gap, bung gap thành danh sách ngày thiếu
+    gaps = np.diff(days).astype('int64')
+    gap_index = np.flatnonzero(gaps > 1)
+    counts = gaps[gap_index] - 1
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    missing = np.repeat(days[gap_index] + 1, counts) + offsets
+
+    # 1970-01-01 là thứ Năm -> weekday (Thứ Hai = 0) = (số ngày + 3) % 7
+    has_weekend_bars = bool((((days.astype('int64') + 3) % 7) >= 5).any())
+    if not has_weekend_bars:
+        missing = missing[((missing.astype('int64') + 3) % 7) < 5]
+
+    return not has_weekend_bars, tuple(np.datetime_as_string(missing, unit='D').tolist())
+
+
+def get_daily_rangebreaks(dates):
+    """
+    Tạo Plotly rangebreaks ẩn các ngày không có nến (chart khung Ngày)
+
+    Nếu data không có nến cuối tuần: 1 pattern 'day of week' cho T7-CN
+    + danh sách ngày nghỉ lễ (ngày thường bị thiếu). Ngược lại mọi ngày
+    thiếu được liệt kê trong values. Không giới hạn số khoảng trống.
+    Kết quả được cache theo tập ngày.
+
+    Parameters:
+    -----------
+    dates : array-like
+        Cột thời gian của các nến (VD: df['time'])
+
+    Returns:
+    --------
+    list : rangebreaks cho fig.update_xaxes (rỗng nếu không có khoảng trống)
+    """
+    days = np.unique(pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]'))
+    hide_weekends, holidays = _find_missing_days(days.tobytes())
+
+    rangebreaks = []
+    if hide_weekends:
+        rangebreaks.append(dict(pattern='day of week', bounds=[6, 1]))
+    if holidays:
+        rangebreaks.append(dict(values=list(holidays)))
+    return rangebreaks